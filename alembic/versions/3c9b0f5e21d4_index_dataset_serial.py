@@ -0,0 +1,30 @@
+"""index dataset serial
+
+Revision ID: 3c9b0f5e21d4
+Revises: 8e0d2514fd1f
+Create Date: 2026-10-14 10:12:41.518243
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c9b0f5e21d4'
+down_revision = '8e0d2514fd1f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_data_set_dataset_serial',
+        'data_set',
+        ['dataset_serial'],
+        unique=False,
+        postgresql_ops={'dataset_serial': 'text_pattern_ops'},
+    )
+
+
+def downgrade():
+    op.drop_index('ix_data_set_dataset_serial', table_name='data_set')
@@ -212,7 +212,8 @@ def download_data(dataset_serial,
             dest_dir,
             "frames_meta.csv",
         )
-        frames_meta.to_csv(local_meta_filename, sep=",")
+        # The dataframe index is just a row counter, don't write it
+        frames_meta.to_csv(local_meta_filename, sep=",", index=False)
         # Extract folder and file names if we want to download
         storage_dir = global_meta["storage_dir"]
         file_names = frames_meta["file_name"]
@@ -229,7 +230,10 @@ def download_data(dataset_serial,
         data_loader.download_files(file_names, dest_dir)
 
 
-if __name__ == '__main__':
+def main():
+    """
+    Parse command line arguments and download data
+    """
     args = parse_args()
     download_data(
         dataset_serial=args.id,
@@ -245,3 +249,7 @@ if __name__ == '__main__':
         channels=args.channels,
         slices=args.slices,
     )
+
+
+if __name__ == '__main__':
+    main()
@@ -68,6 +68,10 @@ def upload_data_and_update_db(csv,
     to storage and metadata to database. If 'frames' is selected as upload
     type, each dataset will be split into individual 2D frames before moving
     to storage.
+    Each dataset is committed as soon as it's stored. If a dataset ID is
+    already in the database the upload stops, unless overwrite is set, in
+    which case the row's database entry is skipped and the upload moves on.
+    Datasets from earlier rows stay committed either way.
     TODO: Add logging instead of printing
 
     :param str login: Full path to json file containing login credentials
@@ -106,6 +110,18 @@ def upload_data_and_update_db(csv,
     assert os.path.isfile(csv), \
         "File doesn't exist: {}".format(csv)
     files_data = pd.read_csv(csv)
+    # Validate csv once up front instead of failing midway through an upload
+    required_cols = {'dataset_id', 'file_name'}
+    assert required_cols.issubset(files_data.columns), \
+        "Csv must contain columns {}, found {}".format(
+            required_cols,
+            list(files_data.columns),
+        )
+    for dataset_serial in files_data['dataset_id']:
+        try:
+            cli_utils.validate_id(dataset_serial)
+        except AssertionError as e:
+            raise AssertionError("Invalid ID:", e)
 
     # Get database connection URI
     db_connection = db_utils.get_connection_str(login)
@@ -146,66 +162,64 @@ def upload_data_and_update_db(csv,
         splitter_class = aux_utils.get_splitter_class(
             config_json['frames_format'],
         )
-    # Upload all files
-    for file_nbr, row in files_data.iterrows():
-        # Assert that ID is correctly formatted
-        dataset_serial = row.dataset_id
-        try:
-            cli_utils.validate_id(dataset_serial)
-        except AssertionError as e:
-            raise AssertionError("Invalid ID:", e)
-
-        # Get S3 directory based on upload type
-        if upload_type == "frames":
-            storage_dir = "/".join([FRAME_FOLDER_NAME, dataset_serial])
-        else:
-            storage_dir = "/".join([FILE_FOLDER_NAME, dataset_serial])
-        # Instantiate database operations class
-        db_inst = db_ops.DatabaseOperations(
-            dataset_serial=dataset_serial,
-        )
-        # Make sure dataset is not already in database
-        if not overwrite:
-            with db_ops.session_scope(db_connection) as session:
+    # Optional csv columns are the same for all rows, so check them once
+    has_parent = 'parent_dataset_id' in files_data.columns
+    has_description = 'description' in files_data.columns
+    has_positions = 'positions' in files_data.columns
+    # Use one database session for all datasets instead of one per query
+    with db_ops.session_scope(db_connection) as session:
+        # Upload all files
+        for row in files_data.itertuples(index=False):
+            dataset_serial = row.dataset_id
+            # Get S3 directory based on upload type
+            if upload_type == "frames":
+                storage_dir = "/".join([FRAME_FOLDER_NAME, dataset_serial])
+            else:
+                storage_dir = "/".join([FILE_FOLDER_NAME, dataset_serial])
+            # Instantiate database operations class
+            db_inst = db_ops.DatabaseOperations(
+                dataset_serial=dataset_serial,
+            )
+            # Make sure dataset is not already in database
+            if not overwrite:
                 db_inst.assert_unique_id(session)
-        # Check for parent dataset
-        parent_dataset_id = 'None'
-        if 'parent_dataset_id' in row:
-            parent_dataset_id = row.parent_dataset_id
-        # Check for dataset description
-        description = None
-        if 'description' in row:
-            if row.description == row.description:
-                description = row.description
+            # Check for parent dataset
+            parent_dataset_id = 'None'
+            if has_parent:
+                parent_dataset_id = row.parent_dataset_id
+            # Check for dataset description
+            description = None
+            if has_description:
+                if row.description == row.description:
+                    description = row.description
 
-        if upload_type == "frames":
-            # Instantiate splitter class
-            frames_inst = splitter_class(
-                data_path=row.file_name,
-                storage_dir=storage_dir,
-                storage_class=storage_class,
-                storage_access=storage_access,
-                overwrite=overwrite,
-                file_format=FRAME_FILE_FORMAT,
-                nbr_workers=nbr_workers,
-            )
-            # Get kwargs if any
-            kwargs = {}
-            if 'positions' in row:
-                positions = row['positions']
-                if not pd.isna(positions):
-                    kwargs['positions'] = positions
-            if 'schema_filename' in config_json:
-                kwargs['schema_filename'] = config_json['schema_filename']
-            if 'filename_parser' in config_json:
-                filename_parser = config_json['filename_parser']
-                kwargs['filename_parser'] = filename_parser
-            # Extract metadata and split file into frames
-            frames_inst.get_frames_and_metadata(**kwargs)
+            if upload_type == "frames":
+                # Instantiate splitter class
+                frames_inst = splitter_class(
+                    data_path=row.file_name,
+                    storage_dir=storage_dir,
+                    storage_class=storage_class,
+                    storage_access=storage_access,
+                    overwrite=overwrite,
+                    file_format=FRAME_FILE_FORMAT,
+                    nbr_workers=nbr_workers,
+                )
+                # Get kwargs if any
+                kwargs = {}
+                if has_positions:
+                    positions = row.positions
+                    if not pd.isna(positions):
+                        kwargs['positions'] = positions
+                if 'schema_filename' in config_json:
+                    kwargs['schema_filename'] = config_json['schema_filename']
+                if 'filename_parser' in config_json:
+                    filename_parser = config_json['filename_parser']
+                    kwargs['filename_parser'] = filename_parser
+                # Extract metadata and split file into frames
+                frames_inst.get_frames_and_metadata(**kwargs)
 
-            # Add frames metadata to database
-            try:
-                with db_ops.session_scope(db_connection) as session:
+                # Add frames metadata to database
+                try:
                     db_inst.insert_frames(
                         session=session,
                         description=description,
@@ -216,31 +230,34 @@ def upload_data_and_update_db(csv,
                         microscope=microscope,
                         parent_dataset=parent_dataset_id,
                     )
-            except AssertionError as e:
-                print("Data set {} already in DB".format(dataset_serial), e)
-        # File upload
-        else:
-            # Just upload file without opening it
-            assert os.path.isfile(row.file_name), \
-                "File doesn't exist: {}".format(row.file_name)
-            data_uploader = storage_class(
-                storage_dir=storage_dir,
-                access_point=storage_access,
-            )
-            if not overwrite:
-                data_uploader.assert_unique_id()
-            try:
-                data_uploader.upload_file(file_path=row.file_name)
-                print("File {} uploaded to S3".format(row.file_name))
-            except AssertionError as e:
-                print("File already on S3, moving on to DB entry. {}".format(e))
+                    # Commit each dataset as soon as its frames are stored
+                    session.commit()
+                except AssertionError as e:
+                    print("Data set {} already in DB".format(dataset_serial), e)
+            # File upload
+            else:
+                # Just upload file without opening it
+                assert os.path.isfile(row.file_name), \
+                    "File doesn't exist: {}".format(row.file_name)
+                data_uploader = storage_class(
+                    storage_dir=storage_dir,
+                    access_point=storage_access,
+                )
+                if not overwrite:
+                    data_uploader.assert_unique_id()
+                try:
+                    data_uploader.upload_file(file_path=row.file_name)
+                    print("File {} uploaded to S3".format(row.file_name))
+                except AssertionError as e:
+                    print("File already on S3, moving on to DB entry. {}".format(
+                        e,
+                    ))
 
-            sha = meta_utils.gen_sha256(row.file_name)
-            # Add file entry to DB once I can get it tested
-            global_json = {"file_origin": row.file_name}
-            file_name = row.file_name.split("/")[-1]
-            try:
-                with db_ops.session_scope(db_connection) as session:
+                sha = meta_utils.gen_sha256(row.file_name)
+                # Add file entry to DB once I can get it tested
+                global_json = {"file_origin": row.file_name}
+                file_name = row.file_name.split("/")[-1]
+                try:
                     db_inst.insert_file(
                         session=session,
                         description=description,
@@ -251,12 +268,18 @@ def upload_data_and_update_db(csv,
                         parent_dataset=parent_dataset_id,
                         sha256=sha,
                     )
-                print("File info for {} inserted in DB".format(dataset_serial))
-            except AssertionError as e:
-                print("File {} already in database".format(dataset_serial))
+                    session.commit()
+                    print("File info for {} inserted in DB".format(
+                        dataset_serial,
+                    ))
+                except AssertionError as e:
+                    print("File {} already in database".format(dataset_serial))
 
 
-if __name__ == '__main__':
+def main():
+    """
+    Parse command line arguments and upload data
+    """
     args = parse_args()
     upload_data_and_update_db(
         csv=args.csv,
@@ -265,3 +288,7 @@ if __name__ == '__main__':
         nbr_workers=args.nbr_workers,
         overwrite=args.overwrite,
     )
+
+
+if __name__ == '__main__':
+    main()
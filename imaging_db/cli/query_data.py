@@ -24,7 +24,7 @@ def parse_args():
         '--project_id',
         type=str,
         default=None,
-        help="Project ID substring (first part of dataset ID)",
+        help="Project ID prefix (first part of dataset ID)",
     )
     parser.add_argument(
         '--microscope',
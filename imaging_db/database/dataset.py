@@ -1,7 +1,8 @@
 # coding=utf-8
 
 from datetime import datetime
-from sqlalchemy import Column, String, Integer, Boolean, ForeignKey, DateTime
+from sqlalchemy import Column, String, Integer, Boolean, ForeignKey, DateTime, \
+    Index
 
 from imaging_db.database.base import Base
 
@@ -20,6 +21,15 @@ def _serial_to_date_time(dataset_serial):
 
 class DataSet(Base):
     __tablename__ = 'data_set'
+    # text_pattern_ops lets prefix LIKE queries as well as equality
+    # lookups on dataset_serial use the index
+    __table_args__ = (
+        Index(
+            'ix_data_set_dataset_serial',
+            'dataset_serial',
+            postgresql_ops={'dataset_serial': 'text_pattern_ops'},
+        ),
+    )
 
     id = Column(Integer, primary_key=True)
     dataset_serial = Column(String)
@@ -1,6 +1,9 @@
 from contextlib import contextmanager
+import io
+import orjson
 import pandas as pd
-from sqlalchemy import create_engine
+import sqlalchemy
+from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 
 from imaging_db.database.base import Base
@@ -10,6 +13,132 @@ from imaging_db.database.frames import Frames
 from imaging_db.database.frames_global import FramesGlobal
 import imaging_db.utils.meta_utils as meta_utils
 
+# Columns in frames_meta that are inserted into the frames table
+FRAMES_COLUMNS = ["channel_idx",
+                  "slice_idx",
+                  "time_idx",
+                  "pos_idx",
+                  "channel_name",
+                  "file_name",
+                  "sha256"]
+# Index columns that must be written as integers when copying frames
+FRAMES_IDX_COLUMNS = ["channel_idx", "slice_idx", "time_idx", "pos_idx"]
+# Number of rows per multi-row INSERT for executemany
+INSERT_PAGE_SIZE = 1000
+# Smallest number of frames inserted with COPY, smaller inserts fit in
+# a single INSERT page
+COPY_MIN_FRAMES = INSERT_PAGE_SIZE
+
+
+def json_dumps(json_meta):
+    """
+    Serialize metadata for JSONB columns with orjson, which is several times
+    faster than the standard library json module. Like json.dumps, non string
+    keys are converted to strings, and numpy values are serialized too.
+
+    :param json_meta: JSON serializable metadata
+    :return str: JSON string
+    """
+    return orjson.dumps(
+        json_meta,
+        option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+    ).decode()
+
+
+def get_executemany_options(version=sqlalchemy.__version__):
+    """
+    Get engine options that send executemany inserts as multi-row INSERTs
+    of up to INSERT_PAGE_SIZE rows instead of one statement per row.
+    The option names depend on the SQLAlchemy version: 1.3 and 1.4 use
+    psycopg2's execute_values, 2.0 batches inserts by default and only
+    takes the page size.
+
+    :param str version: SQLAlchemy version
+    :return dict options: Keyword arguments for create_engine
+    """
+    major, minor = (int(nbr) for nbr in version.split('.')[:2])
+    if major >= 2:
+        return {'insertmanyvalues_page_size': INSERT_PAGE_SIZE}
+    if minor >= 4:
+        executemany_mode = 'values_only'
+    else:
+        executemany_mode = 'values'
+    return {
+        'executemany_mode': executemany_mode,
+        'executemany_values_page_size': INSERT_PAGE_SIZE,
+    }
+
+
+def make_engine(credentials_str, echo_sql=False):
+    """
+    Create SQLAlchemy engine. Executemany inserts are batched into
+    multi-row INSERTs, see get_executemany_options.
+    JSONB metadata is serialized with json_dumps.
+    Credentials with the postgres drivername give a postgres:// URI,
+    which SQLAlchemy 1.4 no longer accepts, so it's changed to the
+    equivalent postgresql://.
+
+    :param str credentials_str: URI for connecting to the database
+    :param bool echo_sql: If true will print all generated SQL code
+    :return SQLAlchemy engine
+    """
+    if credentials_str.startswith('postgres://'):
+        credentials_str = 'postgresql://' + \
+            credentials_str[len('postgres://'):]
+    return create_engine(
+        credentials_str,
+        echo=echo_sql,
+        json_serializer=json_dumps,
+        **get_executemany_options(),
+    )
+
+
+def _copy_field(value):
+    """
+    Format a value as a field in PostgreSQL's COPY text format, where NULL
+    is \\N and backslashes, tabs and newlines are escaped.
+
+    :param value: Value to be copied
+    :return str: COPY text field
+    """
+    if value is None:
+        return '\\N'
+    return str(value).replace('\\', '\\\\') \
+        .replace('\t', '\\t') \
+        .replace('\n', '\\n') \
+        .replace('\r', '\\r')
+
+
+def copy_frames(session, frames_records):
+    """
+    Insert frames with PostgreSQL COPY through the session's connection,
+    which streams all rows in one command instead of parsing INSERT
+    statements.
+
+    :param session: SQLAlchemy session
+    :param list frames_records: Dicts containing the Frames columns,
+        with metadata_json not yet serialized
+    """
+    columns = FRAMES_COLUMNS + ["metadata_json", "frames_global_id"]
+    buffer = io.StringIO()
+    for frame_record in frames_records:
+        fields = dict(frame_record)
+        for col in FRAMES_IDX_COLUMNS:
+            fields[col] = int(fields[col])
+        fields["metadata_json"] = json_dumps(fields["metadata_json"])
+        buffer.write(
+            '\t'.join(_copy_field(fields[col]) for col in columns) + '\n',
+        )
+    buffer.seek(0)
+    with session.connection().connection.cursor() as cursor:
+        cursor.copy_expert(
+            "COPY {} ({}) FROM STDIN".format(
+                Frames.__tablename__,
+                ", ".join(columns),
+            ),
+            buffer,
+        )
+
 
 @contextmanager
 def session_scope(credentials_str, echo_sql=False):
@@ -22,7 +151,7 @@ def session_scope(credentials_str, echo_sql=False):
     :return SQLAlchemy session
     """
     # Create SQLAlchemy engine, connect and return session
-    engine = create_engine(credentials_str, echo=echo_sql)
+    engine = make_engine(credentials_str, echo_sql=echo_sql)
     # create a configured "Session" class
     Session = sessionmaker(bind=engine)
     # Generate database schema
@@ -45,7 +174,7 @@ def test_connection(session):
     :raise Exception: if you can't log in
     """
     try:
-        session.execute('SELECT 1')
+        session.execute(text('SELECT 1'))
     except Exception as e:
         raise ConnectionError("Can't connect to database", e)
 
@@ -68,8 +197,10 @@ def get_datasets(session, search_dict=None):
     datasets = session.query(DataSet) \
         .order_by(DataSet.dataset_serial)
     if 'project_id' in search_dict:
+        # Project ID is the start of the serial, so a prefix match can use
+        # the dataset_serial index instead of scanning the table
         datasets = datasets.filter(
-            DataSet.dataset_serial.contains(search_dict['project_id']),
+            DataSet.dataset_serial.startswith(search_dict['project_id']),
         )
     if 'microscope' in search_dict:
         datasets = datasets.filter(
@@ -108,8 +239,8 @@ class DatabaseOperations:
 
         :param session: SQLAlchemy session
         """
-        # Check if ID already exist
-        datasets = session.query(DataSet) \
+        # Check if ID already exist, only the primary key is needed
+        datasets = session.query(DataSet.id) \
             .filter(DataSet.dataset_serial == self.dataset_serial).all()
         assert len(datasets) == 0, \
             "Dataset {} already exists in database".format(
@@ -135,7 +266,7 @@ class DatabaseOperations:
                 parent_dataset = None
         if parent_dataset is not None:
             try:
-                parent = session.query(DataSet) \
+                parent = session.query(DataSet.id) \
                     .filter(DataSet.dataset_serial == parent_dataset).one()
                 parent_key = parent.id
             except Exception as e:
@@ -172,8 +303,8 @@ class DatabaseOperations:
         :param str microscope: microscope name
         :param str/None parent_dataset: Assign parent if not none
         """
-        # Check if ID already exist
-        datasets = session.query(DataSet) \
+        # Check if ID already exist, only the primary key is needed
+        datasets = session.query(DataSet.id) \
             .filter(DataSet.dataset_serial == self.dataset_serial).all()
         assert len(datasets) == 0, \
             "Dataset {} already exists in database".format(
@@ -204,23 +335,20 @@ class DatabaseOperations:
             metadata_json=global_json_meta,
             data_set=new_dataset,
         )
-        for i in range(frames_meta.shape[0]):
-            # Insert all frames here then add them to new frames global
-            new_frame = Frames(
-                channel_idx=frames_meta.loc[i, "channel_idx"],
-                slice_idx=frames_meta.loc[i, "slice_idx"],
-                time_idx=frames_meta.loc[i, "time_idx"],
-                pos_idx=frames_meta.loc[i, "pos_idx"],
-                channel_name=frames_meta.loc[i, "channel_name"],
-                file_name=frames_meta.loc[i, "file_name"],
-                sha256=frames_meta.loc[i, "sha256"],
-                metadata_json=frames_json_meta[i],
-                frames_global=new_frames_global,
-            )
-            session.add(new_frame)
-
         session.add(new_dataset)
         session.add(new_frames_global)
+        # Flush to get the frames_global key the frames will refer to
+        session.flush()
+        frames_records = frames_meta[FRAMES_COLUMNS].to_dict(orient='records')
+        for i, frame_record in enumerate(frames_records):
+            frame_record["metadata_json"] = frames_json_meta[i]
+            frame_record["frames_global_id"] = new_frames_global.id
+        # Insert all frames with one executemany instead of one ORM
+        # object and flush per frame, or with COPY for large datasets
+        if len(frames_records) >= COPY_MIN_FRAMES:
+            copy_frames(session, frames_records)
+        else:
+            session.execute(Frames.__table__.insert(), frames_records)
 
     def insert_file(self,
                     session,
@@ -243,8 +371,8 @@ class DatabaseOperations:
         :param str sha256: sha256 checksum for file
         :param str parent_dataset: Assign parent if not null
         """
-        # Check if ID already exist
-        datasets = session.query(DataSet) \
+        # Check if ID already exist, only the primary key is needed
+        datasets = session.query(DataSet.id) \
             .filter(DataSet.dataset_serial == self.dataset_serial).all()
         assert len(datasets) == 0, \
             "Dataset {} already exists in database".format(
@@ -320,7 +448,8 @@ class DatabaseOperations:
                 channels=channels,
                 slices=slices,
             )
-            storage_dir = frames_query[0].frames_global.storage_dir
+            # Dataset is already loaded, don't re-run the frames query
+            storage_dir = dataset.frames_global.storage_dir
             file_names = frames_subset['file_name'].tolist()
             return storage_dir, file_names
 
@@ -347,6 +476,10 @@ class DatabaseOperations:
         :raises AssertionError: If no frames matches selected indices
         :raises AssertionError: If both channels and channel_ids are specified.
         """
+        # Only select the returned columns, frame JSON metadata can be large
+        frames_query = frames_query.with_entities(
+            *[getattr(Frames, col) for col in FRAMES_COLUMNS]
+        )
         # Convert query to dataframe
         frames_subset = pd.read_sql(
             frames_query.statement,
@@ -390,37 +523,32 @@ class DatabaseOperations:
         assert frames_subset.shape[0] > 0, 'No frames matched the query'
         # Reset index
         frames_subset = frames_subset.reset_index(drop=True)
-        # Remove jsonb and internal IDs from table
-        frames_subset = frames_subset.drop(
-            columns=['id', 'frames_global_id', 'metadata_json'],
-        )
         return frames_subset
 
     @staticmethod
-    def _get_global_meta(frame):
+    def _get_global_meta(frames_global):
         """
-        Extract global metadata from a frame.
+        Extract global metadata from the frames_global entry of a dataset.
 
-        :param Frames frame: One frame obtained from dataset query
+        :param FramesGlobal frames_global: Global frames info for dataset
         :return dict global_meta: Global metadata for dataset
-        :return dataframe frames_meta: Metadata for each frame
         """
         # Collect global metadata that can be used to instantiate im_stack
         global_meta = {
-            "storage_dir": frame.frames_global.storage_dir,
-            "nbr_frames": frame.frames_global.nbr_frames,
-            "im_width": frame.frames_global.im_width,
-            "im_height": frame.frames_global.im_height,
-            "nbr_slices": frame.frames_global.nbr_slices,
-            "nbr_channels": frame.frames_global.nbr_channels,
-            "im_colors": frame.frames_global.im_colors,
-            "nbr_timepoints": frame.frames_global.nbr_timepoints,
-            "nbr_positions": frame.frames_global.nbr_positions,
-            "bit_depth": frame.frames_global.bit_depth,
+            "storage_dir": frames_global.storage_dir,
+            "nbr_frames": frames_global.nbr_frames,
+            "im_width": frames_global.im_width,
+            "im_height": frames_global.im_height,
+            "nbr_slices": frames_global.nbr_slices,
+            "nbr_channels": frames_global.nbr_channels,
+            "im_colors": frames_global.im_colors,
+            "nbr_timepoints": frames_global.nbr_timepoints,
+            "nbr_positions": frames_global.nbr_positions,
+            "bit_depth": frames_global.bit_depth,
         }
         meta_utils.validate_global_meta(global_meta)
         # Add global JSON metadata
-        global_meta["metadata_json"] = frame.frames_global.metadata_json
+        global_meta["metadata_json"] = frames_global.metadata_json
         return global_meta
 
     def get_frames_meta(self,
@@ -469,6 +597,6 @@ class DatabaseOperations:
             channels=channels,
             slices=slices,
         )
-        # Get global and local metadata
-        global_meta = self._get_global_meta(frames_query[0])
+        # Get global metadata from the already loaded dataset
+        global_meta = self._get_global_meta(dataset.frames_global)
         return global_meta, frames_meta
@@ -1,5 +1,6 @@
 from abc import ABCMeta, abstractmethod
 import concurrent.futures
+import itertools
 import numpy as np
 
 STORAGE_MOUNT_POINT = '/Volumes/data_lg/czbiohub-imaging/'
@@ -46,13 +47,19 @@ class DataStorage(metaclass=ABCMeta):
         :return dict unique_ids: Unique indices in frames_meta, order is
             sctp: slices, channels, timepoints, positions
         """
-        # Metadata don't have to be indexed starting at 0 or continuous
-        unique_ids = {
-            'slices': np.unique(frames_meta["slice_idx"]),
-            'channels': np.unique(frames_meta["channel_idx"]),
-            'times': np.unique(frames_meta["time_idx"]),
-            'pos': np.unique(frames_meta["pos_idx"]),
-        }
+        # Metadata don't have to be indexed starting at 0 or continuous.
+        # Keep the stack index of each frame to check which slots get filled
+        unique_ids = {}
+        stack_idxs = []
+        for name, col in [('slices', "slice_idx"),
+                          ('channels', "channel_idx"),
+                          ('times', "time_idx"),
+                          ('pos', "pos_idx")]:
+            unique_ids[name], idx = np.unique(
+                frames_meta[col],
+                return_inverse=True,
+            )
+            stack_idxs.append(idx)
         stack_shape = (
             global_meta["im_height"],
             global_meta["im_width"],
@@ -62,7 +69,20 @@ class DataStorage(metaclass=ABCMeta):
             len(unique_ids['times']),
             len(unique_ids['pos']),
         )
-        im_stack = np.zeros(stack_shape, global_meta["bit_depth"])
+        # Allocate with frame indices as leading axes (PTCZXYG) so each 2D
+        # frame is one contiguous block, and return an XYGZCTP view of it
+        frame_major_shape = stack_shape[:2:-1] + stack_shape[:3]
+        # Every slot gets written when frames cover the whole stack, so
+        # skip zeroing memory unless some frames are missing. Frames with
+        # duplicate indices can match the slot count and still leave gaps
+        nbr_slots = int(np.prod(stack_shape[3:]))
+        flat_idx = np.ravel_multi_index(stack_idxs, stack_shape[3:])
+        if len(frames_meta) == nbr_slots and \
+                len(np.unique(flat_idx)) == nbr_slots:
+            im_stack = np.empty(frame_major_shape, global_meta["bit_depth"])
+        else:
+            im_stack = np.zeros(frame_major_shape, global_meta["bit_depth"])
+        im_stack = im_stack.transpose(4, 5, 6, 3, 2, 1, 0)
         return im_stack, unique_ids
 
     @staticmethod
@@ -181,18 +201,26 @@ class DataStorage(metaclass=ABCMeta):
         :return np.array im_stack: Stack of 2D images
         """
         assert len(stack_shape) > 2, "Stack shape must be 3D"
-        im_stack = np.zeros(stack_shape, dtype=bit_depth)
-
+        # Allocate frames along the first axis so each frame is contiguous,
+        # then move that axis last to get the requested shape
+        frame_major_shape = (stack_shape[-1],) + tuple(stack_shape[:-1])
+        # Frame i goes to slot i, so a matching count fills every slot
+        if len(file_names) == stack_shape[-1]:
+            im_stack = np.empty(frame_major_shape, dtype=bit_depth)
+        else:
+            im_stack = np.zeros(frame_major_shape, dtype=bit_depth)
+        im_stack = np.moveaxis(im_stack, 0, -1)
+
+        # Write 2D frames directly into the singleton color dimension
+        stack_idx = (Ellipsis,)
+        if stack_shape[2] == 1 and len(stack_shape) > 3:
+            stack_idx = (Ellipsis, 0)
         with concurrent.futures.ThreadPoolExecutor(self.nbr_workers) as executor:
-            pool_result = executor.map(self.get_im, file_names)
-
-        has_color_dim = True
-        if stack_shape[2] > 1:
-            has_color_dim = False
-        for im_nbr, im in enumerate(pool_result):
-            if has_color_dim:
-                im = np.atleast_3d(im)
-            im_stack[..., im_nbr] = im
+            futures = {executor.submit(self.get_im, file_name): im_nbr
+                       for im_nbr, file_name in enumerate(file_names)}
+            # Fill stack as frames arrive instead of waiting in list order
+            for future in concurrent.futures.as_completed(futures):
+                im_stack[stack_idx + (futures[future],)] = future.result()
         return im_stack
 
     def get_stack_from_meta(self, global_meta, frames_meta):
@@ -224,18 +252,26 @@ class DataStorage(metaclass=ABCMeta):
         """
         im_stack, unique_ids = self.make_stack_from_meta(global_meta, frames_meta)
 
+        # Stack indices for each frame, in frames_meta order. Unique ids
+        # are sorted so all positions are found with one search per dimension
+        stack_idxs = list(zip(
+            np.searchsorted(unique_ids['slices'], frames_meta['slice_idx']),
+            np.searchsorted(unique_ids['channels'], frames_meta['channel_idx']),
+            np.searchsorted(unique_ids['times'], frames_meta['time_idx']),
+            np.searchsorted(unique_ids['pos'], frames_meta['pos_idx']),
+        ))
+        # Grayscale frames are 2D, write them directly into color index 0
+        color_idx = slice(None)
+        if im_stack.shape[2] == 1:
+            color_idx = 0
         with concurrent.futures.ThreadPoolExecutor(self.nbr_workers) as executor:
-            pool_result = executor.map(self.get_im, frames_meta['file_name'])
-
-        im_list = list(pool_result)
-        # Fill the image stack given dimensions
-        for im_nbr, row in frames_meta.iterrows():
-            im_stack[:, :, :,
-                     np.where(unique_ids['slices'] == row.slice_idx)[0][0],
-                     np.where(unique_ids['channels'] == row.channel_idx)[0][0],
-                     np.where(unique_ids['times'] == row.time_idx)[0][0],
-                     np.where(unique_ids['pos'] == row.pos_idx)[0][0],
-            ] = np.atleast_3d(im_list[im_nbr])
+            futures = {executor.submit(self.get_im, file_name): im_nbr
+                       for im_nbr, file_name in
+                       enumerate(frames_meta['file_name'])}
+            # Fill the image stack as frames arrive
+            for future in concurrent.futures.as_completed(futures):
+                im_stack[(slice(None), slice(None), color_idx) +
+                         stack_idxs[futures[future]]] = future.result()
         # Return squeezed stack and string that indicates dimension order
         im_stack, dim_str = self.squeeze_stack(im_stack)
         return im_stack, dim_str
@@ -247,10 +283,17 @@ class DataStorage(metaclass=ABCMeta):
 
         :param list file_names: List of (str) file names
         :param str dest_dir: Destination directory path
+        :raise Exception: Re-raises the first error from a failed download
         """
         with concurrent.futures.ThreadPoolExecutor(self.nbr_workers) as ex:
-            {ex.submit(self.download_file, file_name, dest_dir):
-                 file_name for file_name in file_names}
+            pool_result = ex.map(
+                self.download_file,
+                file_names,
+                itertools.repeat(dest_dir),
+            )
+            # Drain results so failed downloads aren't silently dropped
+            for _ in pool_result:
+                pass
 
     @abstractmethod
     def download_file(self, file_name, dest_dir):
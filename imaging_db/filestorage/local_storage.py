@@ -84,7 +84,9 @@ class LocalStorage(data_storage.DataStorage):
 
     def upload_frames(self, file_names, im_stack, file_format=".png"):
         """
-        Writes all frames to storage using threading or multiprocessing
+        Writes all frames to storage using threading. OpenCV releases the
+        GIL while encoding, so threads encode frames in parallel without
+        pickling each frame to a worker process.
 
         :param list file_names: Image file names (str), with extension, no path
         :param np.array im_stack: all 2D frames from file converted to stack
@@ -102,8 +104,10 @@ class LocalStorage(data_storage.DataStorage):
             storage_path = self.get_storage_path(file_name)
             path_im_tuples.append((storage_path, im_stack[..., i]))
 
-        with concurrent.futures.ProcessPoolExecutor(self.nbr_workers) as ex:
-            ex.map(self.upload_im_tuple, path_im_tuples)
+        with concurrent.futures.ThreadPoolExecutor(self.nbr_workers) as ex:
+            # Drain results so failed writes aren't silently dropped
+            for _ in ex.map(self.upload_im_tuple, path_im_tuples):
+                pass
 
     def upload_im_tuple(self, path_im_tuple):
         """
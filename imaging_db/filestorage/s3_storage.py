@@ -1,10 +1,40 @@
 import boto3
+import botocore.config
+import botocore.exceptions
 import concurrent.futures
 import os
+import threading
 
 import imaging_db.filestorage.data_storage as data_storage
 import imaging_db.utils.image_utils as im_utils
 
+# S3 clients by process ID, shared by all S3Storage instances in a process
+_S3_CLIENTS = {}
+_S3_CLIENTS_LOCK = threading.Lock()
+# Botocore defaults to 10 pooled connections, fewer than the transfer
+# threads, so connections would be dropped and reopened
+S3_CONFIG = botocore.config.Config(
+    max_pool_connections=64,
+    retries={'max_attempts': 10, 'mode': 'adaptive'},
+)
+
+
+def get_s3_client():
+    """
+    Get the S3 client for the current process, creating it on first use.
+    boto3 clients are thread safe, so one client and its connection pool
+    can be reused for all datasets and transfer threads. Creating clients
+    from the default session is not thread safe, hence the lock.
+    Clients don't survive a fork, so each process gets its own.
+
+    :return botocore.client.S3 s3_client: Shared S3 client
+    """
+    pid = os.getpid()
+    with _S3_CLIENTS_LOCK:
+        if pid not in _S3_CLIENTS:
+            _S3_CLIENTS[pid] = boto3.client('s3', config=S3_CONFIG)
+        return _S3_CLIENTS[pid]
+
 
 class S3Storage(data_storage.DataStorage):
     """Class for handling data uploads and downloads to S3"""
@@ -29,7 +59,12 @@ class S3Storage(data_storage.DataStorage):
             self.bucket_name = data_storage.S3_BUCKET_NAME
         else:
             self.bucket_name = self.access_point
-        self.s3_client = boto3.client('s3')
+        self.s3_client = get_s3_client()
+        # S3 keys always use forward slashes, build the prefix once
+        self.key_prefix = self.storage_dir.rstrip("/") + "/"
+        # Keys in storage dir, listed on the first frame upload and then
+        # kept up to date with the keys this instance uploads
+        self._known_keys = None
 
     def assert_unique_id(self):
         """
@@ -37,9 +72,12 @@ class S3Storage(data_storage.DataStorage):
 
         :raise AssertionError: if folder exists
         """
+        # One matching key is enough, don't list the whole folder. The
+        # trailing slash keeps serials sharing a prefix from matching
         response = self.s3_client.list_objects_v2(
             Bucket=self.bucket_name,
-            Prefix=self.storage_dir,
+            Prefix=self.key_prefix,
+            MaxKeys=1,
         )
         assert response['KeyCount'] == 0, \
             "Key already exists on S3: {}".format(self.storage_dir)
@@ -51,14 +89,17 @@ class S3Storage(data_storage.DataStorage):
         :param str storage_path: Path in S3 storage
         :return bool: True if file doesn't exist in storage, False otherwise
         """
-        response = self.s3_client.list_objects_v2(
-            Bucket=self.bucket_name,
-            Prefix=storage_path,
-        )
-        if response['KeyCount'] == 0:
-            return True
-        else:
-            return False
+        # A HEAD request on the exact key is cheaper than a prefix listing
+        try:
+            self.s3_client.head_object(
+                Bucket=self.bucket_name,
+                Key=storage_path,
+            )
+        except botocore.exceptions.ClientError as e:
+            if e.response['Error']['Code'] == '404':
+                return True
+            raise
+        return False
 
     def _get_key(self, file_name):
         """
@@ -67,41 +108,81 @@ class S3Storage(data_storage.DataStorage):
         :param str file_name: File name without path
         :return str key: File name with storage path
         """
-        return os.path.join(self.storage_dir, file_name)
+        return self.key_prefix + file_name
+
+    def get_existing_keys(self):
+        """
+        List all keys already in storage under the storage directory with
+        one paginated scan instead of checking each key separately.
+
+        :return set existing_keys: Keys in storage dir
+        """
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        existing_keys = set()
+        for page in paginator.paginate(Bucket=self.bucket_name,
+                                       Prefix=self.key_prefix):
+            for obj in page.get('Contents', []):
+                existing_keys.add(obj['Key'])
+        return existing_keys
+
+    def _get_known_keys(self):
+        """
+        Get keys in storage dir, listing them only on the first call so
+        uploading many positions to the same dir doesn't re-list it.
+
+        :return set known_keys: Keys in storage dir
+        """
+        if self._known_keys is None:
+            self._known_keys = self.get_existing_keys()
+        return self._known_keys
 
     def upload_frames(self, file_names, im_stack, file_format=".png"):
         """
-        Upload all frames to S3 using threading
+        Upload all frames to S3 using threading. Keys already in storage are
+        listed once per storage dir, then each thread serializes and uploads
+        one frame, so network round trips for different frames overlap.
 
         :param list of str file_names: image file names
         :param np.array im_stack: all 2D frames from file converted to stack
         :param str file_format: file format for frames on S3
+        :raise Exception: Re-raises errors from failed uploads
         """
         # Make sure number of file names matches stack shape
         assert len(file_names) == im_stack.shape[-1], \
             "Number of file names {} doesn't match slices {}".format(
                 len(file_names), im_stack.shape[-1])
 
-        serialized_ims = []
-        keys = []
-        for i, file_name in enumerate(file_names):
-            # Create key
-            key = self._get_key(file_name)
-            # Make sure image doesn't already exist
-            if self.nonexistent_storage_path(storage_path=key):
-                # Serialize image
-                im_bytes = im_utils.serialize_im(
+        existing_keys = self._get_known_keys()
+        with concurrent.futures.ThreadPoolExecutor(self.nbr_workers) as ex:
+            futures = {}
+            for i, file_name in enumerate(file_names):
+                key = self._get_key(file_name)
+                # Make sure image doesn't already exist
+                if key in existing_keys:
+                    print("Key {} already exists, next.".format(key))
+                    continue
+                future = ex.submit(
+                    self._serialize_upload,
+                    key=key,
                     im=im_stack[..., i],
                     file_format=file_format,
                 )
-                serialized_ims.append(im_bytes)
-                keys.append(key)
-            else:
-                print("Key {} already exists, next.".format(key))
+                futures[future] = key
+            # Raise upload errors, the executor still waits for all threads
+            for future in concurrent.futures.as_completed(futures):
+                future.result()
+                existing_keys.add(futures[future])
 
-        with concurrent.futures.ThreadPoolExecutor() as ex:
-            {ex.submit(self.upload_serialized, key_byte_tuple):
-                key_byte_tuple for key_byte_tuple in zip(keys, serialized_ims)}
+    def _serialize_upload(self, key, im, file_format):
+        """
+        Serialize image and upload it to key without checking if it exists.
+
+        :param str key: Key including storage dir
+        :param np.array im: 2D image
+        :param str file_format: File format for serialization
+        """
+        im_bytes = im_utils.serialize_im(im=im, file_format=file_format)
+        self.upload_serialized((key, im_bytes))
 
     def upload_serialized(self, key_byte_tuple):
         """
@@ -111,10 +192,8 @@ class S3Storage(data_storage.DataStorage):
         :param tuple key_byte_tuple: Containing key and byte string
         """
         (key, im_bytes) = key_byte_tuple
-        # Create new client
-        s3_client = boto3.client('s3')
         # Upload slice to S3
-        s3_client.put_object(
+        self.s3_client.put_object(
             Bucket=self.bucket_name,
             Key=key,
             Body=im_bytes,
@@ -130,13 +209,11 @@ class S3Storage(data_storage.DataStorage):
         :param str file_format: File format for serialization
         """
         key = self._get_key(im_name)
-        # Create new client
-        s3_client = boto3.client('s3')
         # Make sure image doesn't already exist
         if self.nonexistent_storage_path(storage_path=key):
             im_bytes = im_utils.serialize_im(im, file_format)
             # Upload slice to S3
-            s3_client.put_object(
+            self.s3_client.put_object(
                 Bucket=self.bucket_name,
                 Key=key,
                 Body=im_bytes,
@@ -167,8 +244,7 @@ class S3Storage(data_storage.DataStorage):
         :param str file_name: File name of image, with extension, no path
         :return np.array im: 2D image
         """
-        s3_client = boto3.client('s3')
-        byte_str = s3_client.get_object(
+        byte_str = self.s3_client.get_object(
             Bucket=self.bucket_name,
             Key=self._get_key(file_name),
         )['Body'].read()
@@ -178,17 +254,16 @@ class S3Storage(data_storage.DataStorage):
     def download_file(self, file_name, dest_dir):
         """
         Download a single file from S3 without reading its contents.
-        A new client is created to make boto3 thread safe
+        Clients (unlike resources) are thread safe, so the shared client
+        is used from all download threads
         https://boto3.amazonaws.com/v1/documentation/api/latest/guide/\
-        resources.html#multithreading-multiprocessing
+        clients.html#multithreading-or-multiprocessing-with-clients
 
         :param str file_name: File name
         :param str dest_dir: Destination directory name
         """
-        # Create a new client
-        s3_client = boto3.client('s3')
         dest_path = os.path.join(dest_dir, file_name)
-        s3_client.download_file(
+        self.s3_client.download_file(
             self.bucket_name,
             self._get_key(file_name),
             dest_path,
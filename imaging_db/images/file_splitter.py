@@ -1,4 +1,5 @@
 from abc import ABCMeta, abstractmethod
+import concurrent.futures
 import numpy as np
 
 import imaging_db.utils.meta_utils as meta_utils
@@ -79,16 +80,48 @@ class FileSplitter(metaclass=ABCMeta):
             "global_json has no values yet"
         return self.global_json
 
+    def _make_im_stack(self, nbr_frames):
+        """
+        Allocate an image stack with shape (height, width, colors, frames).
+        Memory is laid out frame by frame, so writing or reading the frame
+        im_stack[..., i] touches one contiguous block.
+        set_frame_info must be called prior to this function call.
+
+        :param int nbr_frames: Number of frames in stack
+        :return np.array im_stack: Empty image stack
+        """
+        im_stack = np.empty((nbr_frames,
+                             self.frame_shape[0],
+                             self.frame_shape[1],
+                             self.im_colors),
+                            dtype=self.bit_depth)
+        return np.moveaxis(im_stack, 0, -1)
+
+    def _get_frame_index(self):
+        """
+        Index for writing frames into an image stack from _make_im_stack,
+        to be extended with the frame number. Grayscale frames are 2D,
+        so they're written directly into color index 0 instead of being
+        expanded to 3D for every frame.
+
+        :return tuple frame_index: Stack index without frame number
+        """
+        if self.im_colors == 1:
+            return slice(None), slice(None), 0
+        return Ellipsis,
+
     def _generate_hash(self, im_stack):
         """
-        calculates the sha256 checksum for all image slices
+        calculates the sha256 checksum for all image slices. Frames are
+        contiguous and hashlib releases the GIL, so frames are hashed from
+        their buffers in parallel threads without copies.
 
         :param ndarray im_stack: image to be hashed
         :return list sha: sha256 hashes indexed by the image index
         """
-        sha = []
-        for i in range(im_stack.shape[3]):
-            sha.append(meta_utils.gen_sha256(im_stack[..., i]))
+        frames = (im_stack[..., i] for i in range(im_stack.shape[3]))
+        with concurrent.futures.ThreadPoolExecutor(self.nbr_workers) as ex:
+            sha = list(ex.map(meta_utils.gen_sha256, frames))
 
         return sha
 
@@ -124,6 +157,26 @@ class FileSplitter(metaclass=ABCMeta):
             "_p" + str(meta_row["pos_idx"]).zfill(self.int2str_len) + \
             self.file_format
 
+    def _get_imnames(self, frames_meta):
+        """
+        Generate image (frame) names for all frames at once with vectorized
+        string operations. Names are the same as from _get_imname.
+
+        :param pd.DataFrame frames_meta: Metadata for frames, must contain
+            frame indices
+        :return pd.Series imnames: Image file names
+        """
+        def idx_str(col_name):
+            # Indices may have been upcast to float when rows were assigned
+            idx = frames_meta[col_name].astype(int).astype(str)
+            return idx.str.zfill(self.int2str_len)
+
+        return "im_c" + idx_str("channel_idx") + \
+            "_z" + idx_str("slice_idx") + \
+            "_t" + idx_str("time_idx") + \
+            "_p" + idx_str("pos_idx") + \
+            self.file_format
+
     def set_global_meta(self, nbr_frames):
         """
         Add values to global_meta given all of the metadata for all the frames.
@@ -133,6 +186,10 @@ class FileSplitter(metaclass=ABCMeta):
         assert not isinstance(self.frame_shape, type(None)),\
             "Frame shape is empty"
 
+        # Count distinct indices with one hash based pass over the columns
+        nbr_unique = self.frames_meta[
+            ["slice_idx", "channel_idx", "time_idx", "pos_idx"]
+        ].nunique()
         self.global_meta = {
             "storage_dir": self.storage_dir,
             "nbr_frames": nbr_frames,
@@ -140,10 +197,10 @@ class FileSplitter(metaclass=ABCMeta):
             "im_width": self.frame_shape[1],
             "im_colors": self.im_colors,
             "bit_depth": self.bit_depth,
-            "nbr_slices": len(np.unique(self.frames_meta["slice_idx"])),
-            "nbr_channels": len(np.unique(self.frames_meta["channel_idx"])),
-            "nbr_timepoints": len(np.unique(self.frames_meta["time_idx"])),
-            "nbr_positions": len(np.unique(self.frames_meta["pos_idx"])),
+            "nbr_slices": int(nbr_unique["slice_idx"]),
+            "nbr_channels": int(nbr_unique["channel_idx"]),
+            "nbr_timepoints": int(nbr_unique["time_idx"]),
+            "nbr_positions": int(nbr_unique["pos_idx"]),
         }
         meta_utils.validate_global_meta(self.global_meta)
 
@@ -1,6 +1,9 @@
 import os
 import re
 
+# Matches all integers in a file name
+INT_PATTERN = re.compile(r'\d+')
+
 
 def parse_ml_name(file_name):
     """
@@ -92,7 +95,7 @@ def parse_idx_from_name(file_name, meta_row, channel_names, order="cztp"):
         "Order needs 4 unique values, not {}".format(order)
 
     # Find all integers in name string
-    ints = re.findall(r'\d+', file_str)
+    ints = INT_PATTERN.findall(file_str)
     assert len(ints) == 4, "Expected 4 integers, found {}".format(len(ints))
     # Assign indices based on ints and order
     idx_dict = {"c": "channel_idx",
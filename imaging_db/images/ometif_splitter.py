@@ -1,6 +1,9 @@
+import concurrent.futures
 import glob
 import numpy as np
 import os
+import pandas as pd
+import re
 import tifffile
 from tqdm import tqdm
 
@@ -55,54 +58,65 @@ class OmeTiffSplitter(file_splitter.FileSplitter):
         else:
             raise ValueError("Bit depth must be 16 or 8, not {}".format(bits_val))
 
-    def split_file(self, file_path, schema_filename):
+    def split_file(self,
+                   file_path,
+                   schema_filename,
+                   frames=None,
+                   meta_schema=None):
         """
         Splits file into frames and gets metadata for each frame.
         set_frame_info must be called prior to this function call.
 
         :param str file_path: Full path to file
         :param str schema_filename: Full path to schema file name
+        :param tifffile.TiffFile/None frames: File already opened from
+            file_path, so it doesn't have to be opened and parsed again.
+            The file is closed after reading.
+        :param dict/None meta_schema: Schema already read from
+            schema_filename, so it isn't read again for every file
         :return dataframe frames_meta: Metadata for all frames
         :return np.array im_stack: Image stack extracted from file
         """
-        frames = tifffile.TiffFile(file_path)
-        # Get global metadata
-        nbr_frames = len(frames.pages)
-        # Create image stack with image bit depth 16 or 8
-        im_stack = np.empty((self.frame_shape[0],
-                             self.frame_shape[1],
-                             self.im_colors,
-                             nbr_frames),
-                            dtype=self.bit_depth)
-
-        # Get metadata schema
-        meta_schema = json_ops.read_json_file(schema_filename)
-        # Convert frames to numpy stack and collect metadata
-        # Separate structured metadata (with known fields)
-        # from unstructured, the latter goes into frames_json
-        frames_meta = meta_utils.make_dataframe(nbr_frames=nbr_frames)
-        # Pandas doesn't really support inserting dicts into dataframes,
-        # so micromanager metadata goes into a separate list
-        for i in range(nbr_frames):
-            page = frames.pages[i]
-            im_stack[..., i] = np.atleast_3d(page.asarray())
-            # Get dict with metadata from json schema
-            json_i, meta_i = json_ops.get_metadata_from_tags(
-                page=page,
-                meta_schema=meta_schema,
-                validate=True,
-            )
-            self.frames_json.append(json_i)
-            # Add required metadata fields to data frame
+        if frames is None:
+            frames = tifffile.TiffFile(file_path)
+        with frames:
+            # Get global metadata
+            nbr_frames = len(frames.pages)
+            # Create image stack with image bit depth 16 or 8
+            im_stack = self._make_im_stack(nbr_frames)
+
+            # Get metadata schema
+            if meta_schema is None:
+                meta_schema = json_ops.read_json_file(schema_filename)
+            # Convert frames to numpy stack and collect metadata
+            # Separate structured metadata (with known fields)
+            # from unstructured, the latter goes into frames_json
+            meta_rows = []
+            # Pandas doesn't really support inserting dicts into dataframes,
+            # so micromanager metadata goes into a separate list
             meta_names = meta_utils.META_NAMES
             df_names = meta_utils.DF_NAMES
-            for meta_name, df_name in zip(meta_names, df_names):
-                if meta_name in meta_i.keys():
-                    frames_meta.loc[i, df_name] = meta_i[meta_name]
-
-            # Create a file name and add it
-            im_name = self._get_imname(frames_meta.loc[i])
-            frames_meta.loc[i, "file_name"] = im_name
+            frame_index = self._get_frame_index()
+            for i in range(nbr_frames):
+                page = frames.pages[i]
+                im_stack[frame_index + (i,)] = page.asarray()
+                # Get dict with metadata from json schema
+                json_i, meta_i = json_ops.get_metadata_from_tags(
+                    page=page,
+                    meta_schema=meta_schema,
+                    validate=True,
+                )
+                self.frames_json.append(json_i)
+                # Add required metadata fields to data frame
+                meta_row = meta_utils.make_meta_row()
+                for meta_name, df_name in zip(meta_names, df_names):
+                    if meta_name in meta_i:
+                        meta_row[df_name] = meta_i[meta_name]
+                meta_rows.append(meta_row)
+
+        frames_meta = meta_utils.make_dataframe_from_rows(meta_rows)
+        # Create file names for all frames
+        frames_meta["file_name"] = self._get_imnames(frames_meta)
         return frames_meta, im_stack
 
     def _validate_file_paths(self, positions, glob_paths):
@@ -116,14 +130,23 @@ class OmeTiffSplitter(file_splitter.FileSplitter):
             in positions
         """
         position_list = self.global_json["IJMetadata"]["InitialPositionList"]
+        labels = [position["Label"] for position in position_list]
+        positions = set(positions)
+        # Find the label in each file name with one regex scan. Longer
+        # labels go first so Pos10 isn't taken for Pos1. First path wins.
+        label_regex = re.compile("|".join(
+            re.escape(label) for label in sorted(labels, key=len, reverse=True)
+        ))
+        path_by_label = {}
+        for glob_path in glob_paths:
+            match = label_regex.search(os.path.basename(glob_path))
+            if match is not None:
+                path_by_label.setdefault(match.group(0), glob_path)
         file_paths = []
-        for p in range(len(position_list)):
-            label = position_list[p]["Label"]
+        for label in labels:
             # Check if the value is in positions
-            if int(label[3:]) in positions:
-                file_path = next((s for s in glob_paths if label in s), None)
-                if file_path is not None:
-                    file_paths.append(file_path)
+            if int(label[3:]) in positions and label in path_by_label:
+                file_paths.append(path_by_label[label])
         assert len(file_paths) > 0, \
             "No positions correspond with IJMetadata PositionList"
         return file_paths
@@ -160,45 +183,70 @@ class OmeTiffSplitter(file_splitter.FileSplitter):
                     print('is int')
                     positions = [positions]
 
-        # Read first file to find available positions
+        # Read first file to find available positions, keep it open for
+        # splitting so it's only parsed once
         frames = tifffile.TiffFile(file_paths[0])
-        # Get global metadata
-        page = frames.pages[0]
-        # Set frame info. This should not vary between positions
-        self.set_frame_info(page)
-        # IJMetadata only exists in first frame, so that goes into global json
-        self.global_json = json_ops.get_global_json(
-            page=page,
-            file_name=self.data_path,
-        )
-        # Validate given positions
-        if len(positions) > 0:
-            file_paths = self._validate_file_paths(
-                positions=positions,
-                glob_paths=file_paths,
-            )
-        self.frames_meta = meta_utils.make_dataframe()
-        self.frames_json = []
-
-        pos_prog_bar = tqdm(file_paths, desc='Position')
-
-        for file_path in pos_prog_bar:
-            file_meta, im_stack = self.split_file(
-                file_path,
-                schema_filename,
-            )
-
-            sha = self._generate_hash(im_stack)
-            file_meta['sha256'] = sha
-
-            self.frames_meta = self.frames_meta.append(
-                file_meta,
-                ignore_index=True,
-            )
-            # Upload frames in file to S3
-            self.data_uploader.upload_frames(
-                file_names=list(file_meta["file_name"]),
-                im_stack=im_stack,
+        opened_files = {file_paths[0]: frames}
+        upload_ex = concurrent.futures.ThreadPoolExecutor(1)
+        # Close opened files and stop the upload worker even if reading,
+        # parsing or uploading a position fails
+        try:
+            # Get global metadata
+            page = frames.pages[0]
+            # Set frame info. This should not vary between positions
+            self.set_frame_info(page)
+            # IJMetadata only exists in first frame, so that goes into
+            # global json
+            self.global_json = json_ops.get_global_json(
+                page=page,
+                file_name=self.data_path,
             )
+            # Validate given positions
+            if len(positions) > 0:
+                file_paths = self._validate_file_paths(
+                    positions=positions,
+                    glob_paths=file_paths,
+                )
+            files_meta = []
+            self.frames_json = []
+            # The schema is the same for all positions, read it once
+            meta_schema = json_ops.read_json_file(schema_filename)
+
+            pos_prog_bar = tqdm(file_paths, desc='Position')
+
+            # Upload each position in the background while the next one
+            # is read
+            upload_future = None
+            for file_path in pos_prog_bar:
+                file_meta, im_stack = self.split_file(
+                    file_path,
+                    schema_filename,
+                    frames=opened_files.pop(file_path, None),
+                    meta_schema=meta_schema,
+                )
+
+                sha = self._generate_hash(im_stack)
+                file_meta['sha256'] = sha
+
+                files_meta.append(file_meta)
+                # Wait for the previous upload so at most two stacks are
+                # held in memory, and so upload errors are raised
+                if upload_future is not None:
+                    upload_future.result()
+                # Upload frames in file to storage
+                upload_future = upload_ex.submit(
+                    self.data_uploader.upload_frames,
+                    file_names=list(file_meta["file_name"]),
+                    im_stack=im_stack,
+                )
+            if upload_future is not None:
+                upload_future.result()
+        finally:
+            upload_ex.shutdown(wait=True)
+            # First file may not have been among the positions to upload
+            for frames in opened_files.values():
+                frames.close()
+        # Concatenate once instead of appending (copying) for each file
+        self.frames_meta = pd.concat(files_meta, ignore_index=True)
         # Finally, set global metadata from frames_meta
         self.set_global_meta(nbr_frames=self.frames_meta.shape[0])
@@ -114,11 +114,7 @@ class TifIDSplitter(file_splitter.FileSplitter):
         nbr_frames = len(frames.pages)
         float2uint = self.set_frame_info(page)
         # Create image stack with image bit depth 16 or 8
-        self.im_stack = np.empty((self.frame_shape[0],
-                                  self.frame_shape[1],
-                                  self.im_colors,
-                                  nbr_frames),
-                                 dtype=self.bit_depth)
+        self.im_stack = self._make_im_stack(nbr_frames)
 
         # Get what little channel info there is from image description
         indices = self._get_params_from_str(
@@ -133,7 +129,7 @@ class TifIDSplitter(file_splitter.FileSplitter):
         self.global_json["file_origin"] = self.data_path
         print('float', float2uint)
         # Convert frames to numpy stack and collect metadata
-        self.frames_meta = meta_utils.make_dataframe(nbr_frames=nbr_frames)
+        meta_rows = []
         self.frames_json = []
         # Loop over all the frames to get data and metadata
         variable_iterator = itertools.product(
@@ -142,6 +138,7 @@ class TifIDSplitter(file_splitter.FileSplitter):
             range(indices['nbr_slices']),
             range(indices['nbr_channels']),
         )
+        frame_index = self._get_frame_index()
         for i, (time_idx, pos_idx, slice_idx, channel_idx) in \
                 enumerate(variable_iterator):
             page = frames.pages[i]
@@ -154,7 +151,7 @@ class TifIDSplitter(file_splitter.FileSplitter):
                 assert im.max() < 65536, "Im > 16 bit, max: {}".format(im.max())
                 im = im.astype(np.uint16)
 
-            self.im_stack[..., i] = np.atleast_3d(im)
+            self.im_stack[frame_index + (i,)] = im
 
             tiftags = page.tags
             # Get all frame specific metadata
@@ -165,14 +162,16 @@ class TifIDSplitter(file_splitter.FileSplitter):
                     dict_i[t] = tiftags[t].value
             self.frames_json.append(dict_i)
 
-            meta_row = dict.fromkeys(meta_utils.DF_NAMES)
-            meta_row["channel_name"] = None
+            meta_row = meta_utils.make_meta_row()
             meta_row["channel_idx"] = channel_idx
             meta_row["time_idx"] = time_idx
             meta_row["pos_idx"] = pos_idx
             meta_row["slice_idx"] = slice_idx
-            meta_row["file_name"] = self._get_imname(meta_row)
-            self.frames_meta.loc[i] = meta_row
+            meta_rows.append(meta_row)
+
+        self.frames_meta = meta_utils.make_dataframe_from_rows(meta_rows)
+        # Create file names for all frames
+        self.frames_meta["file_name"] = self._get_imnames(self.frames_meta)
 
         sha = self._generate_hash(self.im_stack)
         self.frames_meta['sha256'] = sha
@@ -1,6 +1,5 @@
 import concurrent.futures
 import glob
-import json
 import natsort
 import numpy as np
 import os
@@ -37,9 +36,6 @@ class TifFolderSplitter(file_splitter.FileSplitter):
 
         self.channel_names = []
 
-        global data_uploader
-        data_uploader = self.data_uploader
-
     def set_frame_info(self, meta_summary):
         """
         Sets frame shape, im_colors and bit_depth for the class given a summary
@@ -99,10 +95,8 @@ class TifFolderSplitter(file_splitter.FileSplitter):
         :param str file_name: File name or path
         :return dict meta_row: Structured metadata for frame
         """
-        meta_row = dict.fromkeys(meta_utils.DF_NAMES)
+        meta_row = meta_utils.make_meta_row()
         parse_func(file_name, meta_row, self.channel_names)
-
-        meta_row["file_name"] = self._get_imname(meta_row)
         return meta_row
 
     def serialize_upload(self, frame_file_tuple):
@@ -124,14 +118,12 @@ class TifFolderSplitter(file_splitter.FileSplitter):
 
         im = im.asarray()
         sha256 = meta_utils.gen_sha256(im)
-        # Upload to S3 with global client
-        data_uploader.upload_im(
+        self.data_uploader.upload_im(
             im_name=frame_name,
             im=im,
             file_format=self.file_format,
         )
-        # Do a json dumps otherwise some metadata won't pickle
-        return sha256, json.dumps(dict_i)
+        return sha256, dict_i
 
     def get_frames_and_metadata(self, filename_parser='parse_idx_from_name'):
         """
@@ -181,22 +173,24 @@ class TifFolderSplitter(file_splitter.FileSplitter):
             self.set_frame_info_from_file(frame_paths[0])
             self.global_json = {}
 
-        self.frames_meta = meta_utils.make_dataframe(nbr_frames=nbr_frames)
         self.frames_json = []
-        # Loop over all the frames to get metadata
-        for i, frame_path in enumerate(frame_paths):
-            # Get structured frames metadata
-            self.frames_meta.loc[i] = self._set_frame_meta(
-                parse_func=parse_func,
-                file_name=frame_path,
-            )
-        # Use multiprocessing for more efficient file read and upload
+        # Get structured metadata for all the frames
+        self.frames_meta = meta_utils.make_dataframe_from_rows(
+            [self._set_frame_meta(parse_func=parse_func, file_name=frame_path)
+             for frame_path in frame_paths],
+        )
+        # Create file names for all frames
+        self.frames_meta['file_name'] = self._get_imnames(self.frames_meta)
+        # Tif reads, hashing, PNG encoding and uploads all release the GIL,
+        # so threads can share the storage client without pickling frames
         file_names = self.frames_meta['file_name']
-        with concurrent.futures.ProcessPoolExecutor(self.nbr_workers) as ex:
+        with concurrent.futures.ThreadPoolExecutor(self.nbr_workers) as ex:
             res = ex.map(self.serialize_upload, zip(frame_paths, file_names))
         # Collect metadata for each uploaded file
-        for i, (sha256, dict_i) in enumerate(res):
-            self.frames_json.append(json.loads(dict_i))
-            self.frames_meta.loc[i, 'sha256'] = sha256
+        sha256s = []
+        for sha256, dict_i in res:
+            self.frames_json.append(dict_i)
+            sha256s.append(sha256)
+        self.frames_meta['sha256'] = sha256s
         # Set global metadata
         self.set_global_meta(nbr_frames=nbr_frames)
@@ -1,3 +1,4 @@
+import functools
 import json
 import jsonschema
 
@@ -67,6 +68,21 @@ MICROMETA_SCHEMA = {
 }
 
 
+@functools.lru_cache(maxsize=None)
+def _get_validator(schema_str):
+    """
+    Check schema and build its validator once per distinct schema,
+    instead of on every validation.
+
+    :param str schema_str: Schema serialized with sorted keys
+    :return jsonschema validator: Validator for schema
+    """
+    schema_object = json.loads(schema_str)
+    validator_class = jsonschema.validators.validator_for(schema_object)
+    validator_class.check_schema(schema_object)
+    return validator_class(schema_object)
+
+
 def validate_schema(json_object, schema):
     """
     Validate JSON object against predefined schema.
@@ -90,12 +106,12 @@ def validate_schema(json_object, schema):
     else:
         raise AssertionError("Schema neither string or dict")
 
-    # Validate json schema
-    try:
-        jsonschema.validate(json_object, schema_object)
-    except jsonschema.exceptions.ValidationError as e:
-        print(e)
-        raise
+    # Validate json schema using cached validator
+    validator = _get_validator(json.dumps(schema_object, sort_keys=True))
+    error = jsonschema.exceptions.best_match(validator.iter_errors(json_object))
+    if error is not None:
+        print(error)
+        raise error
 
 
 def read_json_file(json_filename, schema_name=None):
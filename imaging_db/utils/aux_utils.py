@@ -1,3 +1,4 @@
+import functools
 import importlib
 import inspect
 
@@ -65,9 +66,11 @@ def get_splitter_class(frames_format):
     return splitter_class
 
 
+@functools.lru_cache(maxsize=8)
 def get_storage_class(storage_type):
     """
     Given storage_type, 'local' or 's3', import filestorage class.
+    The class is looked up once per storage type and then reused.
 
     :param str storage_type: What format your files are stored in
     :return class storage_class: Filestorage class
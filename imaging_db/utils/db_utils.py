@@ -1,3 +1,6 @@
+import functools
+import os
+
 import imaging_db.database.db_operations as db_ops
 import imaging_db.metadata.json_operations as json_ops
 
@@ -22,12 +25,11 @@ def json_to_uri(credentials_json):
         credentials_json["dbname"]
 
 
-def get_connection_str(credentials_filename):
+def _load_connection_str(credentials_filename):
     """
-    Bundles the JSON read of the login credentials file with
-    a conversion to a URI for connecting to the database
+    Read and validate credentials file and convert it to a URI.
 
-    :param credentials_filename: JSON file containing DB credentials
+    :param str credentials_filename: JSON file containing DB credentials
     :return str connection_str: URI for connecting to the DB
     """
     # Read and validate json
@@ -38,6 +40,38 @@ def get_connection_str(credentials_filename):
     return json_to_uri(credentials_json)
 
 
+@functools.lru_cache(maxsize=64)
+def _read_connection_str(credentials_filename, mtime_ns, size):
+    """
+    Cached _load_connection_str. The modification time and size of the
+    file are only part of the key, so an edited file is read again.
+
+    :param str credentials_filename: JSON file containing DB credentials
+    :param int mtime_ns: Modification time of the file in nanoseconds
+    :param int size: Size of the file in bytes
+    :return str connection_str: URI for connecting to the DB
+    """
+    return _load_connection_str(credentials_filename)
+
+
+def get_connection_str(credentials_filename):
+    """
+    Bundles the JSON read of the login credentials file with
+    a conversion to a URI for connecting to the database.
+    The URI is cached until the file changes.
+
+    :param credentials_filename: JSON file containing DB credentials
+    :return str connection_str: URI for connecting to the DB
+    :raises FileNotFoundError: If credentials file doesn't exist
+    """
+    file_stat = os.stat(credentials_filename)
+    return _read_connection_str(
+        os.path.abspath(credentials_filename),
+        file_stat.st_mtime_ns,
+        file_stat.st_size,
+    )
+
+
 def check_connection(db_connection):
     """
     Make sure you can connect to database before anything else.
@@ -16,7 +16,7 @@ def serialize_im(im, file_format='.png'):
         res, im_encoded = cv2.imencode(file_format, im)
     except cv2.error as e:
         raise TypeError("Wrong file format: {}. {}".format(file_format, e))
-    return im_encoded.tostring()
+    return im_encoded.tobytes()
 
 
 def deserialize_im(byte_string):
@@ -26,5 +26,5 @@ def deserialize_im(byte_string):
     :param str byte_string: E.g. from getting an S3 object
     :return np.array im: 2D image
     """
-    im_encoded = np.fromstring(byte_string, dtype='uint8')
+    im_encoded = np.frombuffer(byte_string, dtype='uint8')
     return cv2.imdecode(im_encoded, cv2.IMREAD_ANYDEPTH | cv2.IMREAD_ANYCOLOR)
@@ -2,7 +2,7 @@ import numpy as np
 import pandas as pd
 import hashlib
 
-CHUNK_SIZE = 4096
+CHUNK_SIZE = 1 << 20
 
 
 # Required metadata fields - everything else goes into a json
@@ -20,6 +20,8 @@ DF_NAMES = ["channel_idx",
             "file_name",
             "pos_idx",
             "sha256"]
+# Empty metadata row, copied for each frame
+_META_ROW = dict.fromkeys(DF_NAMES)
 
 
 def make_dataframe(nbr_frames=None, col_names=DF_NAMES):
@@ -42,6 +44,28 @@ def make_dataframe(nbr_frames=None, col_names=DF_NAMES):
     return frames_meta
 
 
+def make_dataframe_from_rows(rows, col_names=DF_NAMES):
+    """
+    Create pandas dataframe from metadata collected for each frame in one go,
+    which is much faster than filling a preallocated dataframe row by row.
+
+    :param list of dicts rows: Metadata for each frame
+    :param list of strs col_names: The dataframe column names
+    :return dataframe frames_meta: Dataframe with one row per frame
+    """
+    return pd.DataFrame(rows, columns=col_names)
+
+
+def make_meta_row():
+    """
+    Create an empty metadata row for a frame, with all DF_NAMES set to None.
+    Copying a prebuilt dict is faster than dict.fromkeys for each frame.
+
+    :return dict meta_row: Metadata for one frame, to be filled in
+    """
+    return _META_ROW.copy()
+
+
 def validate_global_meta(global_meta):
     """
     Validate that global frames meta dictionary contain all required values.
@@ -60,13 +84,11 @@ def validate_global_meta(global_meta):
             "nbr_positions",
             "bit_depth"]
 
-    keys_valid = np.zeros(len(keys), dtype='bool')
-    for idx, key in enumerate(keys):
-        key_valid = (key in global_meta) and \
-                        (global_meta[key] is not None)
-        keys_valid[idx] = key_valid
-    assert np.all(keys_valid),\
-        "Not all required metadata keys are present"
+    missing_keys = [key for key in keys if global_meta.get(key) is None]
+    assert len(missing_keys) == 0, \
+        "Not all required metadata keys are present, missing: {}".format(
+            missing_keys,
+        )
 
 
 def gen_sha256(image):
@@ -74,7 +96,7 @@ def gen_sha256(image):
     Generate the sha-256 hash of an image. If the user
     passes in a numpy ndarray (usually a frame), hash the
     whole numpy. If the user passes in a file path, the 
-    function will hash the file in 4kB chucks
+    function will hash the file in 1MB chunks read into a reused buffer
 
 
     :param ndarray/String image: ndarray containing the image to hash
@@ -87,13 +109,15 @@ def gen_sha256(image):
 
     # If a frame is passed in, hash the numpy array
     if isinstance(image, np.ndarray):
-        sha.update(image.tobytes())
+        sha.update(np.ascontiguousarray(image).data)
     
-    # If a file path is passed in, hash the file in 4kB chunks
+    # If a file path is passed in, hash the file in chunks without
+    # allocating new bytes for each read
     elif isinstance(image, str):
-        with open(image,"rb") as im:
-            for byte_block in iter(lambda: im.read(CHUNK_SIZE),b""):
-                sha.update(byte_block)
+        buffer = memoryview(bytearray(CHUNK_SIZE))
+        with open(image, "rb", buffering=0) as im:
+            for nbr_bytes in iter(lambda: im.readinto(buffer), 0):
+                sha.update(buffer[:nbr_bytes])
 
     else:
         raise TypeError('image must be a numpy ndarray (frame)',
@@ -0,0 +1,139 @@
+import boto3
+import io
+import itertools
+from moto import mock_s3
+import numpy as np
+import os
+import tifffile
+
+import imaging_db.utils.meta_utils as meta_utils
+import tests.database.db_basetest as db_basetest
+
+# One row upload CSV without parent dataset, laid out as DataFrame.to_csv
+# writes it (index first)
+UPLOAD_CSV = (',dataset_id,file_name,description,parent_dataset_id\n'
+              '0,{},{},Testing,\n')
+# The test tif stores frames by slice then channel while uploaded frames
+# are ordered by channel then slice: tif stack index of each frame
+IM_ORDER = [0, 2, 4, 1, 3, 5]
+# File name of the test tif, parse_ml_name reads metadata from it
+TIF_NAME = "A1_2_PROTEIN_test.tif"
+
+
+def build_fixture():
+    """
+    Build the test image shared by the upload and download tests.
+
+    :return np.array im: Test image with 6 frames, tifffile stores
+        channels first
+    :return str description: ImageJ description of the image
+    :return bytes tif_bytes: Image encoded as tif
+    :return list expected_sha: sha256 of the frames in upload order,
+        by channel then slice
+    """
+    im = np.full((6, 10, 15), 50, dtype=np.uint16)
+    im[[0, 2, 4], :5, 3:12] = np.array(
+        [50000, 40000, 30000],
+        dtype=np.uint16,
+    ).reshape(3, 1, 1)
+    # Metadata
+    description = 'ImageJ=1.52e\nimages=6\nchannels=2\nslices=3\nmax=10411.0'
+    tif_buffer = io.BytesIO()
+    tifffile.imsave(
+        tif_buffer,
+        im,
+        description=description,
+        photometric='minisblack',
+        metadata=None,
+        contiguous=True,
+    )
+    expected_sha = [
+        meta_utils.gen_sha256(im[idx, ...]) for idx in IM_ORDER
+    ]
+    return im, description, tif_buffer.getvalue(), expected_sha
+
+
+class CLIBaseTest(db_basetest.DBBaseTest):
+    """
+    Base class for the CLI upload and download tests. The test image is
+    built and encoded as tif once per test class.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Build the test image and encode it as tif once for all tests
+        """
+        cls.im, cls.description, cls.tif_bytes, cls.expected_sha = \
+            build_fixture()
+        # Test metadata parameters
+        cls.nbr_channels = 2
+        cls.nbr_slices = 3
+        # Frame indices and names, by channel then slice
+        cls.frame_idx = list(itertools.product(
+            range(cls.nbr_channels),
+            range(cls.nbr_slices),
+        ))
+        cls.frame_names = [
+            'im_c00{}_z00{}_t000_p000.png'.format(c, z)
+            for c, z in cls.frame_idx
+        ]
+
+    @classmethod
+    def write_tif(cls, dir_path):
+        """
+        Write the encoded test image to a tif file.
+
+        :param str dir_path: Directory to write the tif file to
+        :return str file_path: Path to tif file
+        """
+        file_path = os.path.join(dir_path, TIF_NAME)
+        with open(file_path, 'wb') as tif_file:
+            tif_file.write(cls.tif_bytes)
+        return file_path
+
+    @staticmethod
+    def write_upload_csv(csv_path, dataset_serial, file_path):
+        """
+        Write a one row upload csv from the UPLOAD_CSV template.
+
+        :param str csv_path: Path to csv file
+        :param str dataset_serial: Dataset ID to upload file to
+        :param str file_path: Path to file to upload
+        """
+        with open(csv_path, 'w') as csv_file:
+            csv_file.write(UPLOAD_CSV.format(dataset_serial, file_path))
+
+
+class CLIS3BaseTest(CLIBaseTest):
+    """
+    Base class for CLI tests using S3 storage. A moto S3 bucket is shared
+    by all tests in the class and emptied after each test.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Build the test image, start moto mock and create bucket
+        """
+        super().setUpClass()
+        cls.mock = mock_s3()
+        cls.mock.start()
+        cls.conn = boto3.resource('s3', region_name='us-east-1')
+        cls.bucket_name = 'czbiohub-imaging'
+        cls.bucket = cls.conn.create_bucket(Bucket=cls.bucket_name)
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        Stop moto mock
+        """
+        cls.mock.stop()
+        super().tearDownClass()
+
+    def tearDown(self):
+        """
+        Rollback database session and empty mock bucket
+        """
+        super().tearDown()
+        self.bucket.objects.all().delete()
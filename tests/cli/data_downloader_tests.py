@@ -1,77 +1,86 @@
-import boto3
 import cv2
-import glob
-import itertools
-from moto import mock_s3
 import nose.tools
 import numpy as np
 import numpy.testing
 import os
 import pandas as pd
-import runpy
 from testfixtures import TempDirectory
-import tifffile
 from unittest.mock import patch
 
 import imaging_db.cli.data_downloader as data_downloader
 import imaging_db.cli.data_uploader as data_uploader
-import tests.database.db_basetest as db_basetest
+import tests.cli.cli_basetest as cli_basetest
 import imaging_db.metadata.json_operations as json_ops
-import imaging_db.utils.meta_utils as meta_utils
 
 
-class TestDataDownloader(db_basetest.DBBaseTest):
+def read_ims(im_dir, im_names):
+    """
+    Decode downloaded images from their file bytes and stack them.
+
+    :param str im_dir: Directory containing the images
+    :param list im_names: Image file names
+    :return np.array ims: Images stacked along the first axis
+    """
+    prefix = os.path.join(im_dir, '')
+    ims = [
+        cv2.imdecode(
+            np.fromfile(prefix + im_name, dtype=np.uint8),
+            cv2.IMREAD_ANYDEPTH,
+        )
+        for im_name in im_names
+    ]
+    return np.stack(ims)
+
+
+class TestDataDownloader(cli_basetest.CLIS3BaseTest):
     """
     Test the data downloader with S3 storage
     """
 
-    @patch('imaging_db.database.db_operations.session_scope')
-    def setUp(self, mock_session):
+    @classmethod
+    def setUpClass(cls):
+        """
+        Build the test image, start moto mock and patch database session
+        """
+        super().setUpClass()
+        # Patch the database session for all tests in the class
+        cls.session_patcher = patch(
+            'imaging_db.database.db_operations.session_scope',
+        )
+        cls.mock_session = cls.session_patcher.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        Stop database session patch and moto mock
+        """
+        cls.session_patcher.stop()
+        super().tearDownClass()
+
+    def setUp(self):
         super().setUp()
-        mock_session.return_value.__enter__.return_value = self.session
-        # Setup mock S3 bucket
-        self.mock = mock_s3()
-        self.mock.start()
-        self.conn = boto3.resource('s3', region_name='us-east-1')
-        self.bucket_name = 'czbiohub-imaging'
-        self.conn.create_bucket(Bucket=self.bucket_name)
-        # Test metadata parameters
-        self.nbr_channels = 2
-        self.nbr_slices = 3
+        self.mock_session.return_value.__enter__.return_value = self.session
         # Mock S3 dir
         self.dataset_serial = 'FRAMES-2005-06-09-20-00-00-1000'
         self.frames_storage_dir = os.path.join('raw_frames', self.dataset_serial)
         # Create temporary directory and write temp image
         self.tempdir = TempDirectory()
         self.temp_path = self.tempdir.path
-        # Temporary file with 6 frames, tifffile stores channels first
-        self.im = 50 * np.ones((6, 10, 15), dtype=np.uint16)
-        self.im[0, :5, 3:12] = 50000
-        self.im[2, :5, 3:12] = 40000
-        self.im[4, :5, 3:12] = 30000
-        # Metadata
-        self.description = 'ImageJ=1.52e\nimages=6\nchannels=2\nslices=3\nmax=10411.0'
-        # Save test tif file
-        self.file_path = os.path.join(self.temp_path, "A1_2_PROTEIN_test.tif")
-        tifffile.imsave(
-            self.file_path,
-            self.im,
-            description=self.description,
-        )
-        upload_csv = pd.DataFrame(
-            columns=['dataset_id', 'file_name', 'description'],
-        )
-        upload_csv = upload_csv.append(
-            {'dataset_id': self.dataset_serial,
-             'file_name': self.file_path,
-             'description': 'Testing'},
-            ignore_index=True,
-        )
+        # Create dest dir for downloads
+        self.tempdir.makedir('dest_dir')
+        self.dest_dir = os.path.join(self.temp_path, 'dest_dir')
+        # Save test tif file, encoded once in setUpClass
+        self.file_path = self.write_tif(self.temp_path)
+        # Create input arguments for data upload
         self.csv_path_frames = os.path.join(
             self.temp_path,
             "test_upload_frames.csv",
         )
-        upload_csv.to_csv(self.csv_path_frames)
+        self.write_upload_csv(
+            self.csv_path_frames,
+            self.dataset_serial,
+            self.file_path,
+        )
         self.credentials_path = os.path.join(
             self.main_dir,
             'db_credentials.json',
@@ -103,8 +112,11 @@ class TestDataDownloader(db_basetest.DBBaseTest):
             "test_upload_file.csv",
         )
         # Change to unique serial
-        upload_csv['dataset_id'] = self.dataset_serial_file
-        upload_csv.to_csv(self.csv_path_file)
+        self.write_upload_csv(
+            self.csv_path_file,
+            self.dataset_serial_file,
+            self.file_path,
+        )
         config_path = os.path.join(
             self.temp_path,
             'config_file.json',
@@ -125,12 +137,12 @@ class TestDataDownloader(db_basetest.DBBaseTest):
     def tearDown(self):
         """
         Rollback database session.
-        Tear down temporary folder and file structure, stop moto mock
+        Tear down temporary folder and file structure, empty mock bucket
+        so the next test can upload the same datasets again
         """
         super().tearDown()
-        TempDirectory.cleanup_all()
+        self.tempdir.cleanup()
         self.assertFalse(os.path.isdir(self.temp_path))
-        self.mock.stop()
 
     def test_parse_args(self):
         with patch('argparse._sys.argv',
@@ -168,52 +180,49 @@ class TestDataDownloader(db_basetest.DBBaseTest):
             self.assertTrue(parsed_args.download)
             self.assertIsNone(parsed_args.nbr_workers)
 
-    @patch('imaging_db.database.db_operations.session_scope')
-    def test_download_frames(self, mock_session):
-        mock_session.return_value.__enter__.return_value = self.session
-        # Create dest dir
-        self.tempdir.makedir('dest_dir')
-        dest_dir = os.path.join(self.temp_path, 'dest_dir')
+    def test_download_frames(self):
         # Download data
         data_downloader.download_data(
             dataset_serial=self.dataset_serial,
             login=self.credentials_path,
-            dest=dest_dir,
+            dest=self.dest_dir,
             storage='s3',
         )
-        # Images are separated by slice first then channel
-        im_order = [0, 2, 4, 1, 3, 5]
-        it = itertools.product(range(self.nbr_channels), range(self.nbr_slices))
-        for i, (c, z) in enumerate(it):
-            im_name = 'im_c00{}_z00{}_t000_p000.png'.format(c, z)
-            im_path = os.path.join(
-                dest_dir,
-                self.dataset_serial,
-                im_name,
-            )
-            im = cv2.imread(im_path, cv2.IMREAD_ANYDEPTH)
-            numpy.testing.assert_array_equal(im, self.im[im_order[i], ...])
+        ims = read_ims(
+            os.path.join(self.dest_dir, self.dataset_serial),
+            self.frame_names,
+        )
+        numpy.testing.assert_array_equal(
+            ims,
+            self.im[cli_basetest.IM_ORDER, ...],
+        )
         # Read and validate frames meta
         meta_path = os.path.join(
-            dest_dir,
+            self.dest_dir,
             self.dataset_serial,
             'frames_meta.csv',
         )
         frames_meta = pd.read_csv(meta_path)
-        for i, row in frames_meta.iterrows():
-            c = i // self.nbr_slices
-            z = i % self.nbr_slices
-            self.assertEqual(row.channel_idx, c)
-            self.assertEqual(row.slice_idx, z)
-            self.assertEqual(row.time_idx, 0)
-            self.assertEqual(row.pos_idx, 0)
-            im_name = 'im_c00{}_z00{}_t000_p000.png'.format(c, z)
-            self.assertEqual(row.file_name, im_name)
-            sha256 = meta_utils.gen_sha256(self.im[im_order[i], ...])
-            self.assertEqual(row.sha256, sha256)
+        self.assertListEqual(
+            list(frames_meta),
+            ['channel_idx', 'slice_idx', 'time_idx', 'pos_idx',
+             'channel_name', 'file_name', 'sha256'],
+        )
+        nbr_frames = self.nbr_channels * self.nbr_slices
+        expected_c = np.arange(nbr_frames) // self.nbr_slices
+        expected_z = np.arange(nbr_frames) % self.nbr_slices
+        numpy.testing.assert_array_equal(frames_meta['channel_idx'], expected_c)
+        numpy.testing.assert_array_equal(frames_meta['slice_idx'], expected_z)
+        numpy.testing.assert_array_equal(frames_meta['time_idx'], 0)
+        numpy.testing.assert_array_equal(frames_meta['pos_idx'], 0)
+        self.assertListEqual(
+            frames_meta['file_name'].tolist(),
+            self.frame_names,
+        )
+        self.assertListEqual(frames_meta['sha256'].tolist(), self.expected_sha)
         # Read and validate global meta
         meta_path = os.path.join(
-            dest_dir,
+            self.dest_dir,
             self.dataset_serial,
             'global_metadata.json',
         )
@@ -229,98 +238,80 @@ class TestDataDownloader(db_basetest.DBBaseTest):
         self.assertEqual(meta_json['nbr_positions'], 1)
         self.assertEqual(meta_json['bit_depth'], 'uint16')
 
-    @patch('imaging_db.database.db_operations.session_scope')
-    def test_download_channel(self, mock_session):
-        mock_session.return_value.__enter__.return_value = self.session
-        # Create dest dir
-        self.tempdir.makedir('dest_dir')
-        dest_dir = os.path.join(self.temp_path, 'dest_dir')
+    def test_download_channel(self):
         # Download data
         data_downloader.download_data(
             dataset_serial=self.dataset_serial,
             login=self.credentials_path,
-            dest=dest_dir,
+            dest=self.dest_dir,
             storage='s3',
             channels=1,
         )
-        download_dir = os.path.join(dest_dir, self.dataset_serial)
+        download_dir = os.path.join(self.dest_dir, self.dataset_serial)
         # Check frames_meta content
         frames_meta = pd.read_csv(os.path.join(download_dir, 'frames_meta.csv'))
-        for i, row in frames_meta.iterrows():
-            self.assertEqual(row.channel_idx, 1)
-            im_name = 'im_c001_z00{}_t000_p000.png'.format(i)
-            self.assertEqual(row.file_name, im_name)
+        numpy.testing.assert_array_equal(
+            frames_meta['channel_idx'],
+            np.ones(self.nbr_slices),
+        )
+        expected_names = self.frame_names[self.nbr_slices:]
+        self.assertListEqual(frames_meta['file_name'].tolist(), expected_names)
         # Check downloaded images
-        im_order = [1, 3, 5]
-        for z in range(3):
-            im_name = 'im_c001_z00{}_t000_p000.png'.format(z)
-            im_path = os.path.join(download_dir, im_name)
-            im = cv2.imread(im_path, cv2.IMREAD_ANYDEPTH)
-            numpy.testing.assert_array_equal(im, self.im[im_order[i], ...])
-
-    @patch('imaging_db.database.db_operations.session_scope')
-    def test_download_channel_convert_str(self, mock_session):
-        mock_session.return_value.__enter__.return_value = self.session
-        # Create dest dir
-        self.tempdir.makedir('dest_dir')
-        dest_dir = os.path.join(self.temp_path, 'dest_dir')
+        ims = read_ims(download_dir, expected_names)
+        numpy.testing.assert_array_equal(
+            ims,
+            self.im[cli_basetest.IM_ORDER[self.nbr_slices:], ...],
+        )
+
+    def test_download_channel_convert_str(self):
         # Download data
         data_downloader.download_data(
             dataset_serial=self.dataset_serial,
             login=self.credentials_path,
-            dest=dest_dir,
+            dest=self.dest_dir,
             storage='s3',
             channels='1',
         )
-        download_dir = os.path.join(dest_dir, self.dataset_serial)
+        download_dir = os.path.join(self.dest_dir, self.dataset_serial)
         # Check frames_meta content
         frames_meta = pd.read_csv(os.path.join(download_dir, 'frames_meta.csv'))
-        for i, row in frames_meta.iterrows():
-            self.assertEqual(row.channel_idx, 1)
-            im_name = 'im_c001_z00{}_t000_p000.png'.format(i)
-            self.assertEqual(row.file_name, im_name)
+        numpy.testing.assert_array_equal(
+            frames_meta['channel_idx'],
+            np.ones(self.nbr_slices),
+        )
+        expected_names = self.frame_names[self.nbr_slices:]
+        self.assertListEqual(frames_meta['file_name'].tolist(), expected_names)
         # Check downloaded images
-        im_order = [1, 3, 5]
-        for z in range(3):
-            im_name = 'im_c001_z00{}_t000_p000.png'.format(z)
-            im_path = os.path.join(download_dir, im_name)
-            im = cv2.imread(im_path, cv2.IMREAD_ANYDEPTH)
-            numpy.testing.assert_array_equal(im, self.im[im_order[i], ...])
+        ims = read_ims(download_dir, expected_names)
+        numpy.testing.assert_array_equal(
+            ims,
+            self.im[cli_basetest.IM_ORDER[self.nbr_slices:], ...],
+        )
 
     @nose.tools.raises(AssertionError)
-    @patch('imaging_db.database.db_operations.session_scope')
-    def test_download_channel_name(self, mock_session):
-        mock_session.return_value.__enter__.return_value = self.session
-        # Create dest dir
-        self.tempdir.makedir('dest_dir')
-        dest_dir = os.path.join(self.temp_path, 'dest_dir')
+    def test_download_channel_name(self):
         # Download data
         data_downloader.download_data(
             dataset_serial=self.dataset_serial,
             login=self.credentials_path,
-            dest=dest_dir,
+            dest=self.dest_dir,
             storage='s3',
             channels='channel1',
         )
 
-    @patch('imaging_db.database.db_operations.session_scope')
-    def test_download_pts(self, mock_session):
-        mock_session.return_value.__enter__.return_value = self.session
-        # Create dest dir
-        self.tempdir.makedir('dest_dir')
-        dest_dir = os.path.join(self.temp_path, 'dest_dir')
+    def test_download_pts(self):
         # Download data
         data_downloader.download_data(
             dataset_serial=self.dataset_serial,
             login=self.credentials_path,
-            dest=dest_dir,
+            dest=self.dest_dir,
             storage='s3',
             positions=0,
             times=[0],
             slices=1,
         )
         meta_path = os.path.join(
-            dest_dir,
+            self.dest_dir,
             self.dataset_serial,
             'global_metadata.json',
         )
@@ -330,60 +321,42 @@ class TestDataDownloader(db_basetest.DBBaseTest):
             self.assertEqual(row.time_idx, 0)
             self.assertEqual(row.slice_idx, 1)
 
-    @patch('imaging_db.database.db_operations.session_scope')
-    def test_download_file(self, mock_session):
-        mock_session.return_value.__enter__.return_value = self.session
-        # Create dest dir
-        self.tempdir.makedir('dest_dir')
-        dest_dir = os.path.join(self.temp_path, 'dest_dir')
+    def test_download_file(self):
         # Download data
         data_downloader.download_data(
             dataset_serial=self.dataset_serial_file,
             login=self.credentials_path,
-            dest=dest_dir,
+            dest=self.dest_dir,
             storage='s3',
             metadata=False,
             nbr_workers=2,
         )
         # See if file has been downloaded
-        file_path = os.path.join(
-            dest_dir,
-            self.dataset_serial_file,
-            '*',
-        )
-        found_file = os.path.basename(glob.glob(file_path)[0])
+        file_dir = os.path.join(self.dest_dir, self.dataset_serial_file)
+        with os.scandir(file_dir) as dir_entries:
+            found_file = next(dir_entries).name
         self.assertEqual("A1_2_PROTEIN_test.tif", found_file)
 
     @nose.tools.raises(FileExistsError)
-    @patch('imaging_db.database.db_operations.session_scope')
-    def test_folder_exists(self, mock_session):
-        mock_session.return_value.__enter__.return_value = self.session
-        # Create dest dir
-        self.tempdir.makedir('dest_dir')
+    def test_folder_exists(self):
         self.tempdir.makedir(
             os.path.join('dest_dir', self.dataset_serial_file),
         )
-        dest_dir = os.path.join(self.temp_path, 'dest_dir')
         data_downloader.download_data(
             dataset_serial=self.dataset_serial_file,
             login=self.credentials_path,
-            dest=dest_dir,
+            dest=self.dest_dir,
             storage='s3',
             nbr_workers=2,
             metadata=False,
         )
 
     @nose.tools.raises(AssertionError)
-    @patch('imaging_db.database.db_operations.session_scope')
-    def test_no_download_or_meta(self, mock_session):
-        mock_session.return_value.__enter__.return_value = self.session
-        # Create dest dir
-        self.tempdir.makedir('dest_dir')
-        dest_dir = os.path.join(self.temp_path, 'dest_dir')
+    def test_no_download_or_meta(self):
         data_downloader.download_data(
             dataset_serial=self.dataset_serial_file,
             login=self.credentials_path,
-            dest=dest_dir,
+            dest=self.dest_dir,
             storage='s3',
             metadata=False,
             download=False,
@@ -391,122 +364,104 @@ class TestDataDownloader(db_basetest.DBBaseTest):
         )
 
     @nose.tools.raises(AssertionError)
-    @patch('imaging_db.database.db_operations.session_scope')
-    def test_invalid_dataset(self, mock_session):
-        mock_session.return_value.__enter__.return_value = self.session
-        # Create dest dir
-        self.tempdir.makedir('dest_dir')
+    def test_invalid_dataset(self):
         self.tempdir.makedir(
             os.path.join('dest_dir', self.dataset_serial_file),
         )
-        dest_dir = os.path.join(self.temp_path, 'dest_dir')
         data_downloader.download_data(
             dataset_serial='Not-a-serial',
             login=self.credentials_path,
-            dest=dest_dir,
+            dest=self.dest_dir,
             storage='s3',
             metadata=False,
             nbr_workers=2,
         )
 
     @nose.tools.raises(AssertionError)
-    @patch('imaging_db.database.db_operations.session_scope')
-    def test_negative_workers(self, mock_session):
-        mock_session.return_value.__enter__.return_value = self.session
-        # Create dest dir
-        self.tempdir.makedir('dest_dir')
-        dest_dir = os.path.join(self.temp_path, 'dest_dir')
+    def test_negative_workers(self):
         data_downloader.download_data(
             dataset_serial=self.dataset_serial_file,
             login=self.credentials_path,
-            dest=dest_dir,
+            dest=self.dest_dir,
             storage='s3',
             metadata=False,
             download=False,
             nbr_workers=-2,
         )
 
-    @patch('imaging_db.database.db_operations.session_scope')
-    def test__main__(self, mock_session):
-        mock_session.return_value.__enter__.return_value = self.session
-        # Create dest dir
-        self.tempdir.makedir('dest_dir')
-        dest_dir = os.path.join(self.temp_path, 'dest_dir')
+    def test__main__(self):
         with patch('argparse._sys.argv',
                    ['python',
                     '--id', self.dataset_serial,
-                    '--dest', dest_dir,
+                    '--dest', self.dest_dir,
                     '--storage', 's3',
                     '--login', self.credentials_path]):
-            runpy.run_path(
-                'imaging_db/cli/data_downloader.py',
-                run_name='__main__',
-            )
+            data_downloader.main()
             # Check that files are there
             dest_files = os.listdir(os.path.join(
-                dest_dir,
+                self.dest_dir,
                 self.dataset_serial,
             ))
             self.assertTrue('frames_meta.csv' in dest_files)
             self.assertTrue('global_metadata.json' in dest_files)
-            for c in range(self.nbr_channels):
-                for z in range(self.nbr_slices):
-                    im_name = 'im_c00{}_z00{}_t000_p000.png'.format(c, z)
-                    self.assertTrue(im_name in dest_files)
+            for im_name in self.frame_names:
+                self.assertTrue(im_name in dest_files)
 
 
-class TestDataDownloaderLocalStorage(db_basetest.DBBaseTest):
+class TestDataDownloaderLocalStorage(cli_basetest.CLIBaseTest):
     """
     Test the data downloader with local storage
     """
 
-    @patch('imaging_db.database.db_operations.session_scope')
-    def setUp(self, mock_session):
+    @classmethod
+    def setUpClass(cls):
+        """
+        Build the test image and patch database session
+        """
+        super().setUpClass()
+        # Patch the database session for all tests in the class
+        cls.session_patcher = patch(
+            'imaging_db.database.db_operations.session_scope',
+        )
+        cls.mock_session = cls.session_patcher.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        Stop database session patch
+        """
+        cls.session_patcher.stop()
+        super().tearDownClass()
+
+    def setUp(self):
         super().setUp()
-        mock_session.return_value.__enter__.return_value = self.session
+        self.mock_session.return_value.__enter__.return_value = self.session
         # Create temporary directory and write temp image
         self.tempdir = TempDirectory()
         self.temp_path = self.tempdir.path
+        # Create dest dir for downloads
+        self.tempdir.makedir('dest_dir')
+        self.dest_dir = os.path.join(self.temp_path, 'dest_dir')
         # Mock file storage
         self.tempdir.makedir('storage_mount_point')
         self.mount_point = os.path.join(self.temp_path, 'storage_mount_point')
         self.tempdir.makedir('storage_mount_point/raw_files')
         self.tempdir.makedir('storage_mount_point/raw_frames')
-        # Test metadata parameters
-        self.nbr_channels = 2
-        self.nbr_slices = 3
         # Mock storage dir
         self.dataset_serial = 'FRAMES-2005-06-09-20-00-00-1000'
         self.frames_storage_dir = os.path.join('raw_frames', self.dataset_serial)
-        # Temporary file with 6 frames, tifffile stores channels first
-        self.im = 50 * np.ones((6, 10, 15), dtype=np.uint16)
-        self.im[0, :5, 3:12] = 50000
-        self.im[2, :5, 3:12] = 40000
-        self.im[4, :5, 3:12] = 30000
-        # Metadata
-        self.description = 'ImageJ=1.52e\nimages=6\nchannels=2\nslices=3\nmax=10411.0'
-        # Save test tif file
-        self.file_path = os.path.join(self.temp_path, "A1_2_PROTEIN_test.tif")
-        tifffile.imsave(
-            self.file_path,
-            self.im,
-            description=self.description,
-        )
+        # Save test tif file, encoded once in setUpClass
+        self.file_path = self.write_tif(self.temp_path)
         # Create input arguments for data upload
-        upload_csv = pd.DataFrame(
-            columns=['dataset_id', 'file_name', 'description'],
-        )
-        upload_csv = upload_csv.append(
-            {'dataset_id': self.dataset_serial,
-             'file_name': self.file_path,
-             'description': 'Testing'},
-            ignore_index=True,
-        )
         self.csv_path_frames = os.path.join(
             self.temp_path,
             "test_upload_frames.csv",
         )
-        upload_csv.to_csv(self.csv_path_frames)
+        self.write_upload_csv(
+            self.csv_path_frames,
+            self.dataset_serial,
+            self.file_path,
+        )
         self.credentials_path = os.path.join(
             self.main_dir,
             'db_credentials.json',
@@ -538,8 +493,11 @@ class TestDataDownloaderLocalStorage(db_basetest.DBBaseTest):
             "test_upload_file.csv",
         )
         # Change to unique serial
-        upload_csv['dataset_id'] = self.dataset_serial_file
-        upload_csv.to_csv(self.csv_path_file)
+        self.write_upload_csv(
+            self.csv_path_file,
+            self.dataset_serial_file,
+            self.file_path,
+        )
         config_path = os.path.join(
             self.temp_path,
             'config_file.json',
@@ -567,52 +525,44 @@ class TestDataDownloaderLocalStorage(db_basetest.DBBaseTest):
         TempDirectory.cleanup_all()
         self.assertFalse(os.path.isdir(self.temp_path))
 
-    @patch('imaging_db.database.db_operations.session_scope')
-    def test_download_frames(self, mock_session):
-        mock_session.return_value.__enter__.return_value = self.session
-        # Create dest dir
-        self.tempdir.makedir('dest_dir')
-        dest_dir = os.path.join(self.temp_path, 'dest_dir')
+    def test_download_frames(self):
         # Download data
         data_downloader.download_data(
             dataset_serial=self.dataset_serial,
             login=self.credentials_path,
-            dest=dest_dir,
+            dest=self.dest_dir,
             storage_access=self.mount_point,
         )
-        # Images are separated by slice first then channel
-        im_order = [0, 2, 4, 1, 3, 5]
-        it = itertools.product(range(self.nbr_channels), range(self.nbr_slices))
-        for i, (c, z) in enumerate(it):
-            im_name = 'im_c00{}_z00{}_t000_p000.png'.format(c, z)
-            im_path = os.path.join(
-                dest_dir,
-                self.dataset_serial,
-                im_name,
-            )
-            im = cv2.imread(im_path, cv2.IMREAD_ANYDEPTH)
-            numpy.testing.assert_array_equal(im, self.im[im_order[i], ...])
+        ims = read_ims(
+            os.path.join(self.dest_dir, self.dataset_serial),
+            self.frame_names,
+        )
+        numpy.testing.assert_array_equal(
+            ims,
+            self.im[cli_basetest.IM_ORDER, ...],
+        )
         # Read and validate frames meta
         meta_path = os.path.join(
-            dest_dir,
+            self.dest_dir,
             self.dataset_serial,
             'frames_meta.csv',
         )
         frames_meta = pd.read_csv(meta_path)
-        for i, row in frames_meta.iterrows():
-            c = i // self.nbr_slices
-            z = i % self.nbr_slices
-            self.assertEqual(row.channel_idx, c)
-            self.assertEqual(row.slice_idx, z)
-            self.assertEqual(row.time_idx, 0)
-            self.assertEqual(row.pos_idx, 0)
-            im_name = 'im_c00{}_z00{}_t000_p000.png'.format(c, z)
-            self.assertEqual(row.file_name, im_name)
-            sha256 = meta_utils.gen_sha256(self.im[im_order[i], ...])
-            self.assertEqual(row.sha256, sha256)
+        nbr_frames = self.nbr_channels * self.nbr_slices
+        expected_c = np.arange(nbr_frames) // self.nbr_slices
+        expected_z = np.arange(nbr_frames) % self.nbr_slices
+        numpy.testing.assert_array_equal(frames_meta['channel_idx'], expected_c)
+        numpy.testing.assert_array_equal(frames_meta['slice_idx'], expected_z)
+        numpy.testing.assert_array_equal(frames_meta['time_idx'], 0)
+        numpy.testing.assert_array_equal(frames_meta['pos_idx'], 0)
+        self.assertListEqual(
+            frames_meta['file_name'].tolist(),
+            self.frame_names,
+        )
+        self.assertListEqual(frames_meta['sha256'].tolist(), self.expected_sha)
         # Read and validate global meta
         meta_path = os.path.join(
-            dest_dir,
+            self.dest_dir,
             self.dataset_serial,
             'global_metadata.json',
         )
@@ -628,69 +578,55 @@ class TestDataDownloaderLocalStorage(db_basetest.DBBaseTest):
         self.assertEqual(meta_json['nbr_positions'], 1)
         self.assertEqual(meta_json['bit_depth'], 'uint16')
 
-    @patch('imaging_db.database.db_operations.session_scope')
-    def test_download_channel(self, mock_session):
-        mock_session.return_value.__enter__.return_value = self.session
-        # Create dest dir
-        self.tempdir.makedir('dest_dir')
-        dest_dir = os.path.join(self.temp_path, 'dest_dir')
+    def test_download_channel(self):
         # Download data
         data_downloader.download_data(
             dataset_serial=self.dataset_serial,
             login=self.credentials_path,
-            dest=dest_dir,
+            dest=self.dest_dir,
             storage_access=self.mount_point,
             channels=1,
         )
-        download_dir = os.path.join(dest_dir, self.dataset_serial)
+        download_dir = os.path.join(self.dest_dir, self.dataset_serial)
         # Check frames_meta content
         frames_meta = pd.read_csv(os.path.join(download_dir, 'frames_meta.csv'))
-        for i, row in frames_meta.iterrows():
-            self.assertEqual(row.channel_idx, 1)
-            im_name = 'im_c001_z00{}_t000_p000.png'.format(i)
-            self.assertEqual(row.file_name, im_name)
+        numpy.testing.assert_array_equal(
+            frames_meta['channel_idx'],
+            np.ones(self.nbr_slices),
+        )
+        expected_names = self.frame_names[self.nbr_slices:]
+        self.assertListEqual(frames_meta['file_name'].tolist(), expected_names)
         # Check downloaded images
-        im_order = [1, 3, 5]
-        for z in range(3):
-            im_name = 'im_c001_z00{}_t000_p000.png'.format(z)
-            im_path = os.path.join(download_dir, im_name)
-            im = cv2.imread(im_path, cv2.IMREAD_ANYDEPTH)
-            numpy.testing.assert_array_equal(im, self.im[im_order[i], ...])
+        ims = read_ims(download_dir, expected_names)
+        numpy.testing.assert_array_equal(
+            ims,
+            self.im[cli_basetest.IM_ORDER[self.nbr_slices:], ...],
+        )
 
     @nose.tools.raises(AssertionError)
-    @patch('imaging_db.database.db_operations.session_scope')
-    def test_download_channel_name(self, mock_session):
-        mock_session.return_value.__enter__.return_value = self.session
-        # Create dest dir
-        self.tempdir.makedir('dest_dir')
-        dest_dir = os.path.join(self.temp_path, 'dest_dir')
+    def test_download_channel_name(self):
         # Download data
         data_downloader.download_data(
             dataset_serial=self.dataset_serial,
             login=self.credentials_path,
-            dest=dest_dir,
+            dest=self.dest_dir,
             storage_access=self.mount_point,
             channels='channel1',
         )
 
-    @patch('imaging_db.database.db_operations.session_scope')
-    def test_download_pts(self, mock_session):
-        mock_session.return_value.__enter__.return_value = self.session
-        # Create dest dir
-        self.tempdir.makedir('dest_dir')
-        dest_dir = os.path.join(self.temp_path, 'dest_dir')
+    def test_download_pts(self):
         # Download data
         data_downloader.download_data(
             dataset_serial=self.dataset_serial,
             login=self.credentials_path,
-            dest=dest_dir,
+            dest=self.dest_dir,
             storage_access=self.mount_point,
             positions=0,
             times=0,
             slices=1,
         )
         meta_path = os.path.join(
-            dest_dir,
+            self.dest_dir,
             self.dataset_serial,
             'global_metadata.json',
         )
@@ -700,44 +636,31 @@ class TestDataDownloaderLocalStorage(db_basetest.DBBaseTest):
             self.assertEqual(row.time_idx, 0)
             self.assertEqual(row.slice_idx, 1)
 
-    @patch('imaging_db.database.db_operations.session_scope')
-    def test_download_file(self, mock_session):
-        mock_session.return_value.__enter__.return_value = self.session
-        # Create dest dir
-        self.tempdir.makedir('dest_dir')
-        dest_dir = os.path.join(self.temp_path, 'dest_dir')
+    def test_download_file(self):
         # Download data
         data_downloader.download_data(
             dataset_serial=self.dataset_serial_file,
             login=self.credentials_path,
-            dest=dest_dir,
+            dest=self.dest_dir,
             storage_access=self.mount_point,
             metadata=False,
             nbr_workers=2,
         )
         # See if file has been downloaded
-        file_path = os.path.join(
-            dest_dir,
-            self.dataset_serial_file,
-            '*',
-        )
-        found_file = os.path.basename(glob.glob(file_path)[0])
+        file_dir = os.path.join(self.dest_dir, self.dataset_serial_file)
+        with os.scandir(file_dir) as dir_entries:
+            found_file = next(dir_entries).name
         self.assertEqual("A1_2_PROTEIN_test.tif", found_file)
 
     @nose.tools.raises(FileExistsError)
-    @patch('imaging_db.database.db_operations.session_scope')
-    def test_folder_exists(self, mock_session):
-        mock_session.return_value.__enter__.return_value = self.session
-        # Create dest dir
-        self.tempdir.makedir('dest_dir')
+    def test_folder_exists(self):
         self.tempdir.makedir(
             os.path.join('dest_dir', self.dataset_serial_file),
         )
-        dest_dir = os.path.join(self.temp_path, 'dest_dir')
         data_downloader.download_data(
             dataset_serial=self.dataset_serial_file,
             login=self.credentials_path,
-            dest=dest_dir,
+            dest=self.dest_dir,
             storage_access=self.mount_point,
             nbr_workers=2,
             metadata=False,
@@ -1,14 +1,13 @@
 import boto3
+import concurrent.futures
 import cv2
 import itertools
 import json
-from moto import mock_s3
 import nose.tools
 import numpy as np
 import numpy.testing
 import os
 import pandas as pd
-import runpy
 from testfixtures import TempDirectory
 import tifffile
 from unittest.mock import patch
@@ -18,81 +17,67 @@ import imaging_db.cli.data_uploader as data_uploader
 import imaging_db.metadata.json_operations as json_ops
 import imaging_db.utils.image_utils as im_utils
 import imaging_db.utils.meta_utils as meta_utils
-import tests.database.db_basetest as db_basetest
+import tests.cli.cli_basetest as cli_basetest
 
 
-class TestDataUploader(db_basetest.DBBaseTest):
+class TestDataUploader(cli_basetest.CLIS3BaseTest):
     """
     Test the data uploader using S3 storage
     """
 
+    @classmethod
+    def setUpClass(cls):
+        """
+        Build the test image, start moto mock and write the tif file, csv
+        and config once, they are the same for all tests
+        """
+        super().setUpClass()
+        cls.class_tempdir = TempDirectory()
+        cls.dataset_serial = 'TEST-2005-06-09-20-00-00-1000'
+        cls.file_path = cls.write_tif(cls.class_tempdir.path)
+        cls.csv_path = os.path.join(cls.class_tempdir.path, "test_upload.csv")
+        cls.write_upload_csv(cls.csv_path, cls.dataset_serial, cls.file_path)
+        cls.config_path = os.path.join(
+            cls.class_tempdir.path,
+            'config_tif_id.json',
+        )
+        config = {
+            "upload_type": "frames",
+            "frames_format": "tif_id",
+            "microscope": "Leica microscope CAN bus adapter",
+            "filename_parser": "parse_ml_name",
+            "storage": "s3"
+        }
+        json_ops.write_json_file(config, cls.config_path)
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        Remove shared files, stop moto mock
+        """
+        cls.class_tempdir.cleanup()
+        super().tearDownClass()
+
     def setUp(self):
         super().setUp()
-        # Setup mock S3 bucket
-        self.mock = mock_s3()
-        self.mock.start()
-        self.conn = boto3.resource('s3', region_name='us-east-1')
-        self.bucket_name = 'czbiohub-imaging'
-        self.conn.create_bucket(Bucket=self.bucket_name)
-        # Test metadata parameters
-        self.nbr_channels = 2
-        self.nbr_slices = 3
         # Mock S3 dir
         self.storage_dir = "raw_frames/TEST-2005-06-09-20-00-00-1000"
-        # Create temporary directory and write temp image
+        # Create temporary directory for test specific files
         self.tempdir = TempDirectory()
         self.temp_path = self.tempdir.path
-        # Temporary file with 6 frames, tifffile stores channels first
-        self.im = 50 * np.ones((6, 10, 15), dtype=np.uint16)
-        self.im[0, :5, 3:12] = 50000
-        self.im[2, :5, 3:12] = 40000
-        self.im[4, :5, 3:12] = 30000
-        # Metadata
-        self.description = 'ImageJ=1.52e\nimages=6\nchannels=2\nslices=3\nmax=10411.0'
-        # Save test tif file
-        self.file_path = os.path.join(self.temp_path, "A1_2_PROTEIN_test.tif")
-        tifffile.imsave(
-            self.file_path,
-            self.im,
-            description=self.description,
-        )
-        self.dataset_serial = 'TEST-2005-06-09-20-00-00-1000'
-        # Create csv file for upload
-        upload_dict = {
-            'dataset_id': [self.dataset_serial],
-            'file_name': [self.file_path],
-            'description': ['Testing'],
-            'parent_dataset_id': [None],
-        }
-        upload_csv = pd.DataFrame.from_dict(upload_dict)
-        self.csv_path = os.path.join(self.temp_path, "test_upload.csv")
-        upload_csv.to_csv(self.csv_path)
         self.credentials_path = os.path.join(
             self.main_dir,
             'db_credentials.json',
         )
-        self.config_path = os.path.join(
-            self.temp_path,
-            'config_tif_id.json',
-        )
-        config = {
-            "upload_type": "frames",
-            "frames_format": "tif_id",
-            "microscope": "Leica microscope CAN bus adapter",
-            "filename_parser": "parse_ml_name",
-            "storage": "s3"
-        }
-        json_ops.write_json_file(config, self.config_path)
 
     def tearDown(self):
         """
         Rollback database session.
-        Tear down temporary folder and file structure, stop moto mock
+        Tear down temporary folder and file structure, empty mock bucket
         """
         super().tearDown()
-        TempDirectory.cleanup_all()
+        self.tempdir.cleanup()
         self.assertFalse(os.path.isdir(self.temp_path))
-        self.mock.stop()
 
     def test_parse_args(self):
         with patch('argparse._sys.argv',
@@ -108,6 +93,71 @@ class TestDataUploader(db_basetest.DBBaseTest):
             self.assertFalse(parsed_args.overwrite)
             self.assertEqual(parsed_args.nbr_workers, 5)
 
+    @patch('imaging_db.database.db_operations.session_scope')
+    def test_upload_duplicate_id(self, mock_session):
+        # A dataset ID repeated partway through the csv stops the upload
+        mock_session.return_value.__enter__.return_value = self.session
+        other_serial = 'TEST-2005-06-09-20-00-00-1001'
+        csv_path = os.path.join(self.temp_path, "duplicate_upload.csv")
+        upload_csv = pd.DataFrame({
+            'dataset_id': [self.dataset_serial,
+                           self.dataset_serial,
+                           other_serial],
+            'file_name': [self.file_path] * 3,
+            'description': ['Testing'] * 3,
+        })
+        upload_csv.to_csv(csv_path)
+        with self.assertRaisesRegex(
+                AssertionError,
+                'Dataset {} already exists'.format(self.dataset_serial)):
+            data_uploader.upload_data_and_update_db(
+                csv=csv_path,
+                login=self.credentials_path,
+                config=self.config_path,
+            )
+        # The first dataset is committed, rows after the duplicate are not
+        datasets = self.session.query(db_ops.DataSet) \
+            .order_by(db_ops.DataSet.dataset_serial) \
+            .all()
+        self.assertListEqual(
+            [dataset.dataset_serial for dataset in datasets],
+            [self.dataset_serial],
+        )
+        frames = self.session.query(db_ops.Frames).all()
+        self.assertEqual(len(frames), len(self.frame_names))
+
+    @patch('imaging_db.database.db_operations.session_scope')
+    def test_upload_duplicate_id_overwrite(self, mock_session):
+        # With overwrite, a repeated dataset ID is skipped when inserting
+        # it in the database and the upload moves on to the next row
+        mock_session.return_value.__enter__.return_value = self.session
+        other_serial = 'TEST-2005-06-09-20-00-00-1001'
+        csv_path = os.path.join(self.temp_path, "duplicate_upload.csv")
+        upload_csv = pd.DataFrame({
+            'dataset_id': [self.dataset_serial,
+                           self.dataset_serial,
+                           other_serial],
+            'file_name': [self.file_path] * 3,
+            'description': ['Testing'] * 3,
+        })
+        upload_csv.to_csv(csv_path)
+        data_uploader.upload_data_and_update_db(
+            csv=csv_path,
+            login=self.credentials_path,
+            config=self.config_path,
+            overwrite=True,
+        )
+        # Both datasets are committed once, with one set of frames each
+        datasets = self.session.query(db_ops.DataSet) \
+            .order_by(db_ops.DataSet.dataset_serial) \
+            .all()
+        self.assertListEqual(
+            [dataset.dataset_serial for dataset in datasets],
+            [self.dataset_serial, other_serial],
+        )
+        frames = self.session.query(db_ops.Frames).all()
+        self.assertEqual(len(frames), 2 * len(self.frame_names))
+
     @patch('imaging_db.database.db_operations.session_scope')
     def test_upload_frames(self, mock_session):
         # Testing uploading frames as tif_id
@@ -118,10 +168,9 @@ class TestDataUploader(db_basetest.DBBaseTest):
             config=self.config_path,
         )
         # Query database to find data_set and frames
-        datasets = self.session.query(db_ops.DataSet) \
-            .filter(db_ops.DataSet.dataset_serial == self.dataset_serial)
-        self.assertEqual(datasets.count(), 1)
-        dataset = datasets[0]
+        dataset = self.session.query(db_ops.DataSet) \
+            .filter(db_ops.DataSet.dataset_serial == self.dataset_serial) \
+            .one()
         self.assertEqual(dataset.id, 1)
         self.assertTrue(dataset.frames)
         self.assertEqual(dataset.dataset_serial, self.dataset_serial)
@@ -133,47 +182,48 @@ class TestDataUploader(db_basetest.DBBaseTest):
                          "Leica microscope CAN bus adapter")
         self.assertEqual(dataset.description, 'Testing')
         # query frames_global
-        global_query = self.session.query(db_ops.FramesGlobal) \
+        frames_global = self.session.query(db_ops.FramesGlobal) \
             .join(db_ops.DataSet) \
-            .filter(db_ops.DataSet.dataset_serial == self.dataset_serial)
+            .filter(db_ops.DataSet.dataset_serial == self.dataset_serial) \
+            .one()
         self.assertEqual(
-            global_query[0].storage_dir,
+            frames_global.storage_dir,
             self.storage_dir,
         )
         self.assertEqual(
-            global_query[0].nbr_frames,
+            frames_global.nbr_frames,
             self.nbr_channels * self.nbr_slices,
         )
         im_shape = self.im.shape
         self.assertEqual(
-            global_query[0].im_width,
+            frames_global.im_width,
             im_shape[2],
         )
         self.assertEqual(
-            global_query[0].im_height,
+            frames_global.im_height,
             im_shape[1],
         )
         self.assertEqual(
-            global_query[0].nbr_slices,
+            frames_global.nbr_slices,
             self.nbr_slices)
         self.assertEqual(
-            global_query[0].nbr_channels,
+            frames_global.nbr_channels,
             self.nbr_channels,
         )
         self.assertEqual(
-            global_query[0].nbr_positions,
+            frames_global.nbr_positions,
             1,
         )
         self.assertEqual(
-            global_query[0].nbr_timepoints,
+            frames_global.nbr_timepoints,
             1,
         )
         self.assertEqual(
-            global_query[0].im_colors,
+            frames_global.im_colors,
             1,
         )
         self.assertEqual(
-            global_query[0].bit_depth,
+            frames_global.bit_depth,
             'uint16',
         )
         # query frames
@@ -181,31 +231,46 @@ class TestDataUploader(db_basetest.DBBaseTest):
             .join(db_ops.FramesGlobal) \
             .join(db_ops.DataSet) \
             .filter(db_ops.DataSet.dataset_serial == self.dataset_serial) \
-            .order_by(db_ops.Frames.file_name)
-        # Images are separated by slice first then channel
-        im_order = [0, 2, 4, 1, 3, 5]
-        it = itertools.product(range(self.nbr_channels), range(self.nbr_slices))
-        for i, (c, z) in enumerate(it):
-            im_name = 'im_c00{}_z00{}_t000_p000.png'.format(c, z)
-            self.assertEqual(frames[i].file_name, im_name)
-            self.assertEqual(frames[i].channel_idx, c)
-            self.assertEqual(frames[i].slice_idx, z)
-            self.assertEqual(frames[i].time_idx, 0)
-            self.assertEqual(frames[i].pos_idx, 0)
-            sha256 = meta_utils.gen_sha256(self.im[im_order[i], ...])
-            self.assertEqual(frames[i].sha256, sha256)
+            .order_by(db_ops.Frames.file_name) \
+            .all()
+        self.assertListEqual(
+            [frame.file_name for frame in frames],
+            self.frame_names,
+        )
+        self.assertListEqual(
+            [(frame.channel_idx, frame.slice_idx) for frame in frames],
+            self.frame_idx,
+        )
+        self.assertListEqual(
+            [(frame.time_idx, frame.pos_idx) for frame in frames],
+            [(0, 0)] * len(self.frame_idx),
+        )
+        self.assertListEqual(
+            [frame.sha256 for frame in frames],
+            self.expected_sha,
+        )
         # Download frames from storage and compare to originals
-        it = itertools.product(range(self.nbr_channels), range(self.nbr_slices))
-        for i, (c, z) in enumerate(it):
-            im_name = 'im_c00{}_z00{}_t000_p000.png'.format(c, z)
-            key = os.path.join(self.storage_dir, im_name)
-            byte_string = self.conn.Object(
-                self.bucket_name, key).get()['Body'].read()
-            # Construct an array from the bytes and decode image
-            im = im_utils.deserialize_im(byte_string)
-            # Assert that contents are the same
+        keys = [
+            os.path.join(self.storage_dir, im_name)
+            for im_name in self.frame_names
+        ]
+        s3_client = boto3.client('s3')
+
+        def get_bytes(key):
+            response = s3_client.get_object(Bucket=self.bucket_name, Key=key)
+            return response['Body'].read()
+
+        with concurrent.futures.ThreadPoolExecutor(len(keys)) as executor:
+            byte_strings = list(executor.map(get_bytes, keys))
+        # Construct arrays from the bytes and decode images
+        ims = [im_utils.deserialize_im(b) for b in byte_strings]
+        # Assert that contents are the same
+        for im in ims:
             nose.tools.assert_equal(im.dtype, np.uint16)
-            numpy.testing.assert_array_equal(im, self.im[im_order[i], ...])
+        numpy.testing.assert_array_equal(
+            np.stack(ims),
+            self.im[cli_basetest.IM_ORDER, ...],
+        )
 
     @nose.tools.raises(AssertionError)
     @patch('imaging_db.database.db_operations.session_scope')
@@ -267,10 +332,9 @@ class TestDataUploader(db_basetest.DBBaseTest):
             config=config_path,
         )
         # Query database to find data_set and file_global
-        datasets = self.session.query(db_ops.DataSet) \
-            .filter(db_ops.DataSet.dataset_serial == self.dataset_serial)
-        self.assertEqual(datasets.count(), 1)
-        dataset = datasets[0]
+        dataset = self.session.query(db_ops.DataSet) \
+            .filter(db_ops.DataSet.dataset_serial == self.dataset_serial) \
+            .one()
         self.assertEqual(dataset.id, 1)
         self.assertFalse(dataset.frames)
         self.assertEqual(dataset.dataset_serial, self.dataset_serial)
@@ -299,9 +363,8 @@ class TestDataUploader(db_basetest.DBBaseTest):
         s3_client = boto3.client('s3')
         key = os.path.join(expected_s3, "A1_2_PROTEIN_test.tif")
         # Just check that the file is there, we've dissected it before
-        response = s3_client.list_objects_v2(Bucket=self.bucket_name,
-                                             Prefix=key)
-        self.assertEqual(response['KeyCount'], 1)
+        response = s3_client.head_object(Bucket=self.bucket_name, Key=key)
+        self.assertEqual(response['ContentLength'], len(self.tif_bytes))
 
     @patch('imaging_db.database.db_operations.session_scope')
     def test_upload_file_already_in_db(self, mock_session):
@@ -343,6 +406,22 @@ class TestDataUploader(db_basetest.DBBaseTest):
             config=self.config_path,
         )
 
+    @nose.tools.raises(AssertionError)
+    @patch('imaging_db.database.db_operations.session_scope')
+    def test_csv_missing_column(self, mock_session):
+        mock_session.return_value.__enter__.return_value = self.session
+        # Csv without file names
+        upload_csv = pd.DataFrame.from_dict(
+            {'dataset_id': [self.dataset_serial]},
+        )
+        invalid_csv_path = os.path.join(self.temp_path, "no_file_name.csv")
+        upload_csv.to_csv(invalid_csv_path)
+        data_uploader.upload_data_and_update_db(
+            csv=invalid_csv_path,
+            login=self.credentials_path,
+            config=self.config_path,
+        )
+
     @nose.tools.raises(AssertionError)
     @patch('imaging_db.database.db_operations.session_scope')
     def test_negative_workers(self, mock_session):
@@ -425,15 +504,11 @@ class TestDataUploader(db_basetest.DBBaseTest):
                     '--csv', self.csv_path,
                     '--login', self.credentials_path,
                     '--config', self.config_path]):
-            runpy.run_path(
-                'imaging_db/cli/data_uploader.py',
-                run_name='__main__',
-            )
+            data_uploader.main()
             # Query database to find data_set and frames
-            datasets = self.session.query(db_ops.DataSet) \
-                .filter(db_ops.DataSet.dataset_serial == self.dataset_serial)
-            self.assertEqual(datasets.count(), 1)
-            dataset = datasets[0]
+            dataset = self.session.query(db_ops.DataSet) \
+                .filter(db_ops.DataSet.dataset_serial == self.dataset_serial) \
+                .one()
             self.assertTrue(dataset.frames)
             self.assertEqual(dataset.dataset_serial, self.dataset_serial)
             date_time = dataset.date_time
@@ -445,14 +520,35 @@ class TestDataUploader(db_basetest.DBBaseTest):
             self.assertEqual(dataset.description, 'Testing')
 
 
-class TestDataUploaderLocalStorage(db_basetest.DBBaseTest):
+class TestDataUploaderLocalStorage(cli_basetest.CLIBaseTest):
     """
     Test the data uploader using local storage
     """
 
+    @classmethod
+    def setUpClass(cls):
+        """
+        Build the test image and write the tif file and csv once, they are
+        the same for all tests
+        """
+        super().setUpClass()
+        cls.class_tempdir = TempDirectory()
+        cls.dataset_serial = 'TEST-2005-06-09-20-00-00-1000'
+        cls.file_path = cls.write_tif(cls.class_tempdir.path)
+        cls.csv_path = os.path.join(cls.class_tempdir.path, "test_upload.csv")
+        cls.write_upload_csv(cls.csv_path, cls.dataset_serial, cls.file_path)
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        Remove shared files
+        """
+        cls.class_tempdir.cleanup()
+        super().tearDownClass()
+
     def setUp(self):
         super().setUp()
-        # Create temporary directory and write temp image
+        # Create temporary directory for storage and test specific files
         self.tempdir = TempDirectory()
         self.temp_path = self.tempdir.path
         # Mock file storage
@@ -461,36 +557,8 @@ class TestDataUploaderLocalStorage(db_basetest.DBBaseTest):
         self.tempdir.makedir('storage_mount_point/raw_files')
         self.tempdir.makedir('storage_mount_point/raw_frames')
 
-        # Test metadata parameters
-        self.nbr_channels = 2
-        self.nbr_slices = 3
         # Mock S3 dir
         self.storage_dir = "raw_frames/TEST-2005-06-09-20-00-00-1000"
-        # Temporary file with 6 frames, tifffile stores channels first
-        self.im = 50 * np.ones((6, 10, 15), dtype=np.uint16)
-        self.im[0, :5, 3:12] = 50000
-        self.im[2, :5, 3:12] = 40000
-        self.im[4, :5, 3:12] = 30000
-        # Metadata
-        self.description = 'ImageJ=1.52e\nimages=6\nchannels=2\nslices=3\nmax=10411.0'
-        # Save test tif file
-        self.file_path = os.path.join(self.temp_path, "A1_2_PROTEIN_test.tif")
-        tifffile.imsave(
-            self.file_path,
-            self.im,
-            description=self.description,
-        )
-        self.dataset_serial = 'TEST-2005-06-09-20-00-00-1000'
-        # Create csv file for upload
-        upload_dict = {
-            'dataset_id': [self.dataset_serial],
-            'file_name': [self.file_path],
-            'description': ['Testing'],
-            'parent_dataset_id': [None],
-        }
-        upload_csv = pd.DataFrame.from_dict(upload_dict)
-        self.csv_path = os.path.join(self.temp_path, "test_upload.csv")
-        upload_csv.to_csv(self.csv_path)
         self.credentials_path = os.path.join(
             self.main_dir,
             'db_credentials.json',
@@ -512,10 +580,10 @@ class TestDataUploaderLocalStorage(db_basetest.DBBaseTest):
     def tearDown(self):
         """
         Rollback database session.
-        Tear down temporary folder and file structure, stop moto mock
+        Tear down temporary folder and file structure
         """
         super().tearDown()
-        TempDirectory.cleanup_all()
+        self.tempdir.cleanup()
         self.assertFalse(os.path.isdir(self.temp_path))
 
     @patch('imaging_db.database.db_operations.session_scope')
@@ -527,10 +595,9 @@ class TestDataUploaderLocalStorage(db_basetest.DBBaseTest):
             config=self.config_path,
         )
         # Query database to find data_set and frames
-        datasets = self.session.query(db_ops.DataSet) \
-            .filter(db_ops.DataSet.dataset_serial == self.dataset_serial)
-        self.assertEqual(datasets.count(), 1)
-        dataset = datasets[0]
+        dataset = self.session.query(db_ops.DataSet) \
+            .filter(db_ops.DataSet.dataset_serial == self.dataset_serial) \
+            .one()
         self.assertEqual(dataset.id, 1)
         self.assertTrue(dataset.frames)
         self.assertEqual(dataset.dataset_serial, self.dataset_serial)
@@ -542,47 +609,48 @@ class TestDataUploaderLocalStorage(db_basetest.DBBaseTest):
                          "Leica microscope CAN bus adapter")
         self.assertEqual(dataset.description, 'Testing')
         # query frames_global
-        global_query = self.session.query(db_ops.FramesGlobal) \
+        frames_global = self.session.query(db_ops.FramesGlobal) \
             .join(db_ops.DataSet) \
-            .filter(db_ops.DataSet.dataset_serial == self.dataset_serial)
+            .filter(db_ops.DataSet.dataset_serial == self.dataset_serial) \
+            .one()
         self.assertEqual(
-            global_query[0].storage_dir,
+            frames_global.storage_dir,
             self.storage_dir,
         )
         self.assertEqual(
-            global_query[0].nbr_frames,
+            frames_global.nbr_frames,
             self.nbr_channels * self.nbr_slices,
         )
         im_shape = self.im.shape
         self.assertEqual(
-            global_query[0].im_width,
+            frames_global.im_width,
             im_shape[2],
         )
         self.assertEqual(
-            global_query[0].im_height,
+            frames_global.im_height,
             im_shape[1],
         )
         self.assertEqual(
-            global_query[0].nbr_slices,
+            frames_global.nbr_slices,
             self.nbr_slices)
         self.assertEqual(
-            global_query[0].nbr_channels,
+            frames_global.nbr_channels,
             self.nbr_channels,
         )
         self.assertEqual(
-            global_query[0].nbr_positions,
+            frames_global.nbr_positions,
             1,
         )
         self.assertEqual(
-            global_query[0].nbr_timepoints,
+            frames_global.nbr_timepoints,
             1,
         )
         self.assertEqual(
-            global_query[0].im_colors,
+            frames_global.im_colors,
             1,
         )
         self.assertEqual(
-            global_query[0].bit_depth,
+            frames_global.bit_depth,
             'uint16',
         )
         # query frames
@@ -590,27 +658,36 @@ class TestDataUploaderLocalStorage(db_basetest.DBBaseTest):
             .join(db_ops.FramesGlobal) \
             .join(db_ops.DataSet) \
             .filter(db_ops.DataSet.dataset_serial == self.dataset_serial) \
-            .order_by(db_ops.Frames.file_name)
-        # Images are separated by slice first then channel
-        im_order = [0, 2, 4, 1, 3, 5]
-        it = itertools.product(range(self.nbr_channels), range(self.nbr_slices))
-        for i, (c, z) in enumerate(it):
-            im_name = 'im_c00{}_z00{}_t000_p000.png'.format(c, z)
-            self.assertEqual(frames[i].file_name, im_name)
-            self.assertEqual(frames[i].channel_idx, c)
-            self.assertEqual(frames[i].slice_idx, z)
-            self.assertEqual(frames[i].time_idx, 0)
-            self.assertEqual(frames[i].pos_idx, 0)
-            sha256 = meta_utils.gen_sha256(self.im[im_order[i], ...])
-            self.assertEqual(frames[i].sha256, sha256)
+            .order_by(db_ops.Frames.file_name) \
+            .all()
+        self.assertListEqual(
+            [frame.file_name for frame in frames],
+            self.frame_names,
+        )
+        self.assertListEqual(
+            [(frame.channel_idx, frame.slice_idx) for frame in frames],
+            self.frame_idx,
+        )
+        self.assertListEqual(
+            [(frame.time_idx, frame.pos_idx) for frame in frames],
+            [(0, 0)] * len(self.frame_idx),
+        )
+        self.assertListEqual(
+            [frame.sha256 for frame in frames],
+            self.expected_sha,
+        )
         # Download frames from storage and compare to originals
-        it = itertools.product(range(self.nbr_channels), range(self.nbr_slices))
-        for i, (c, z) in enumerate(it):
-            im_name = 'im_c00{}_z00{}_t000_p000.png'.format(c, z)
-            im_path = os.path.join(self.mount_point, self.storage_dir, im_name)
-            im = cv2.imread(im_path, cv2.IMREAD_ANYDEPTH)
+        im_dir = os.path.join(self.mount_point, self.storage_dir)
+        ims = [
+            cv2.imread(os.path.join(im_dir, im_name), cv2.IMREAD_ANYDEPTH)
+            for im_name in self.frame_names
+        ]
+        for im in ims:
             nose.tools.assert_equal(im.dtype, np.uint16)
-            numpy.testing.assert_array_equal(im, self.im[im_order[i], ...])
+        numpy.testing.assert_array_equal(
+            np.stack(ims),
+            self.im[cli_basetest.IM_ORDER, ...],
+        )
 
     @patch('imaging_db.database.db_operations.session_scope')
     def test_upload_frames_already_in_db(self, mock_session):
@@ -651,10 +728,9 @@ class TestDataUploaderLocalStorage(db_basetest.DBBaseTest):
             config=config_path,
         )
         # Query database to find data_set and file_global
-        datasets = self.session.query(db_ops.DataSet) \
-            .filter(db_ops.DataSet.dataset_serial == self.dataset_serial)
-        self.assertEqual(datasets.count(), 1)
-        dataset = datasets[0]
+        dataset = self.session.query(db_ops.DataSet) \
+            .filter(db_ops.DataSet.dataset_serial == self.dataset_serial) \
+            .one()
         self.assertEqual(dataset.id, 1)
         self.assertFalse(dataset.frames)
         self.assertEqual(dataset.dataset_serial, self.dataset_serial)
@@ -778,10 +854,9 @@ class TestDataUploaderLocalStorage(db_basetest.DBBaseTest):
             config=config_path,
         )
         # Query database to find data_set and frames
-        datasets = self.session.query(db_ops.DataSet) \
-            .filter(db_ops.DataSet.dataset_serial == dataset_serial)
-        self.assertEqual(datasets.count(), 1)
-        dataset = datasets[0]
+        dataset = self.session.query(db_ops.DataSet) \
+            .filter(db_ops.DataSet.dataset_serial == dataset_serial) \
+            .one()
         self.assertEqual(dataset.id, 1)
         self.assertTrue(dataset.frames)
         self.assertEqual(dataset.dataset_serial, dataset_serial)
@@ -791,47 +866,48 @@ class TestDataUploaderLocalStorage(db_basetest.DBBaseTest):
         self.assertEqual(date_time.day, 1)
         self.assertEqual(dataset.description, 'Testing')
         # query frames_global
-        global_query = self.session.query(db_ops.FramesGlobal) \
+        frames_global = self.session.query(db_ops.FramesGlobal) \
             .join(db_ops.DataSet) \
-            .filter(db_ops.DataSet.dataset_serial == dataset_serial)
+            .filter(db_ops.DataSet.dataset_serial == dataset_serial) \
+            .one()
         self.assertEqual(
-            global_query[0].storage_dir,
+            frames_global.storage_dir,
             'raw_frames/' + dataset_serial,
         )
         self.assertEqual(
-            global_query[0].nbr_frames,
+            frames_global.nbr_frames,
             2,
         )
         im_shape = im.shape
         self.assertEqual(
-            global_query[0].im_width,
+            frames_global.im_width,
             im_shape[1],
         )
         self.assertEqual(
-            global_query[0].im_height,
+            frames_global.im_height,
             im_shape[0],
         )
         self.assertEqual(
-            global_query[0].nbr_slices,
+            frames_global.nbr_slices,
             1)
         self.assertEqual(
-            global_query[0].nbr_channels,
+            frames_global.nbr_channels,
             2,
         )
         self.assertEqual(
-            global_query[0].nbr_positions,
+            frames_global.nbr_positions,
             1,
         )
         self.assertEqual(
-            global_query[0].nbr_timepoints,
+            frames_global.nbr_timepoints,
             1,
         )
         self.assertEqual(
-            global_query[0].im_colors,
+            frames_global.im_colors,
             1,
         )
         self.assertEqual(
-            global_query[0].bit_depth,
+            frames_global.bit_depth,
             'uint16',
         )
         # query frames
@@ -839,7 +915,8 @@ class TestDataUploaderLocalStorage(db_basetest.DBBaseTest):
             .join(db_ops.FramesGlobal) \
             .join(db_ops.DataSet) \
             .filter(db_ops.DataSet.dataset_serial == dataset_serial) \
-            .order_by(db_ops.Frames.file_name)
+            .order_by(db_ops.Frames.file_name) \
+            .all()
 
         shas = [meta_utils.gen_sha256(im), meta_utils.gen_sha256(im + 10000)]
         for i, c in enumerate(channel_ids):
@@ -861,7 +938,7 @@ class TestDataUploaderLocalStorage(db_basetest.DBBaseTest):
                 im_name,
             )
             im_out = cv2.imread(im_path, cv2.IMREAD_ANYDEPTH)
-            nose.tools.assert_equal(im.dtype, np.uint16)
+            nose.tools.assert_equal(im_out.dtype, np.uint16)
             numpy.testing.assert_array_equal(im_out, im + i * 10000)
 
     @patch('imaging_db.database.db_operations.session_scope')
@@ -876,6 +953,8 @@ class TestDataUploaderLocalStorage(db_basetest.DBBaseTest):
         self.tempdir.makedir('tiffolder')
         tif_dir = os.path.join(self.temp_path, 'tiffolder')
         channel_names = ['phase', 'brightfield', '666']
+        # All channels share the same two slices, only compute them once
+        slices = [im + 50 * z for z in range(2)]
         # Write files in dir
         for c_name in channel_names:
             for z in range(2):
@@ -884,7 +963,7 @@ class TestDataUploaderLocalStorage(db_basetest.DBBaseTest):
                 ijmeta = {"Info": json.dumps({"c": c_name, "z": z})}
                 tifffile.imsave(
                     file_path,
-                    im + 50 * z,
+                    slices[z],
                     ijmetadata=ijmeta,
                 )
         # Write external metadata in dir
@@ -930,10 +1009,9 @@ class TestDataUploaderLocalStorage(db_basetest.DBBaseTest):
             config=config_path,
         )
         # Query database to find data_set and frames
-        datasets = self.session.query(db_ops.DataSet) \
-            .filter(db_ops.DataSet.dataset_serial == dataset_serial)
-        self.assertEqual(datasets.count(), 1)
-        dataset = datasets[0]
+        dataset = self.session.query(db_ops.DataSet) \
+            .filter(db_ops.DataSet.dataset_serial == dataset_serial) \
+            .one()
         self.assertTrue(dataset.frames)
         self.assertEqual(dataset.dataset_serial, dataset_serial)
         date_time = dataset.date_time
@@ -942,46 +1020,47 @@ class TestDataUploaderLocalStorage(db_basetest.DBBaseTest):
         self.assertEqual(date_time.day, 1)
         self.assertEqual(dataset.description, 'Testing tifffolder upload')
         # query frames_global
-        global_query = self.session.query(db_ops.FramesGlobal) \
+        frames_global = self.session.query(db_ops.FramesGlobal) \
             .join(db_ops.DataSet) \
-            .filter(db_ops.DataSet.dataset_serial == dataset_serial)
+            .filter(db_ops.DataSet.dataset_serial == dataset_serial) \
+            .one()
         self.assertEqual(
-            global_query[0].storage_dir,
+            frames_global.storage_dir,
             'raw_frames/' + dataset_serial,
         )
         self.assertEqual(
-            global_query[0].nbr_frames,
+            frames_global.nbr_frames,
             6,
         )
         self.assertEqual(
-            global_query[0].im_width,
+            frames_global.im_width,
             15,
         )
         self.assertEqual(
-            global_query[0].im_height,
+            frames_global.im_height,
             10,
         )
         self.assertEqual(
-            global_query[0].nbr_slices,
+            frames_global.nbr_slices,
             2)
         self.assertEqual(
-            global_query[0].nbr_channels,
+            frames_global.nbr_channels,
             3,
         )
         self.assertEqual(
-            global_query[0].nbr_positions,
+            frames_global.nbr_positions,
             1,
         )
         self.assertEqual(
-            global_query[0].nbr_timepoints,
+            frames_global.nbr_timepoints,
             1,
         )
         self.assertEqual(
-            global_query[0].im_colors,
+            frames_global.im_colors,
             1,
         )
         self.assertEqual(
-            global_query[0].bit_depth,
+            frames_global.bit_depth,
             'uint8',
         )
         # query frames
@@ -989,10 +1068,13 @@ class TestDataUploaderLocalStorage(db_basetest.DBBaseTest):
             .join(db_ops.FramesGlobal) \
             .join(db_ops.DataSet) \
             .filter(db_ops.DataSet.dataset_serial == dataset_serial) \
-            .order_by(db_ops.Frames.file_name)
+            .order_by(db_ops.Frames.file_name) \
+            .all()
         # Validate content
         # Channel numbers will be assigned alphabetically
         channel_names.sort()
+        # Every channel has the same two slices, hash them once
+        sha_by_z = [meta_utils.gen_sha256(im_z) for im_z in slices]
         for i, (c, z) in enumerate(itertools.product(range(3), range(2))):
             im_name = 'im_c00{}_z00{}_t060_p050.png'.format(c, z)
             self.assertEqual(frames[i].file_name, im_name)
@@ -1001,10 +1083,7 @@ class TestDataUploaderLocalStorage(db_basetest.DBBaseTest):
             self.assertEqual(frames[i].slice_idx, z)
             self.assertEqual(frames[i].time_idx, 60)
             self.assertEqual(frames[i].pos_idx, 50)
-            self.assertEqual(
-                frames[i].sha256,
-                meta_utils.gen_sha256(im + 50 * z),
-            )
+            self.assertEqual(frames[i].sha256, sha_by_z[z])
         # # Download frames from storage and compare to originals
         for i in range(len(channel_names)):
             for z in range(2):
@@ -1015,6 +1094,6 @@ class TestDataUploaderLocalStorage(db_basetest.DBBaseTest):
                     dataset_serial,
                     im_name,
                 )
-            im_out = cv2.imread(im_path, cv2.IMREAD_ANYDEPTH)
-            nose.tools.assert_equal(im.dtype, np.uint8)
-            numpy.testing.assert_array_equal(im_out, im + z * 50)
+                im_out = cv2.imread(im_path, cv2.IMREAD_ANYDEPTH)
+                nose.tools.assert_equal(im_out.dtype, np.uint8)
+                numpy.testing.assert_array_equal(im_out, slices[z])
@@ -1,6 +1,5 @@
 import os
 import unittest
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 import imaging_db.database.db_operations as db_ops
@@ -32,7 +31,7 @@ class DBBaseTest(unittest.TestCase):
         self.credentials_str = db_utils.get_connection_str(credentials_path)
         # Create database connection
         self.Session = sessionmaker()
-        self.engine = create_engine(self.credentials_str)
+        self.engine = db_ops.make_engine(self.credentials_str)
         # connect to the database
         self.connection = self.engine.connect()
         # begin a non-ORM transaction
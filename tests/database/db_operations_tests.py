@@ -1,6 +1,9 @@
 import itertools
+import json
 import nose.tools
+import numpy as np
 import pandas as pd
+from unittest.mock import patch
 
 import tests.database.db_basetest as db_basetest
 import imaging_db.database.db_operations as db_ops
@@ -97,6 +100,43 @@ class TestDBOperations(db_basetest.DBBaseTest):
     def test_connection_no_session(self):
         db_ops.test_connection('session')
 
+    def test_make_engine(self):
+        engine = db_ops.make_engine(self.credentials_str)
+        # Page size attribute is named after the installed version's option
+        options = db_ops.get_executemany_options()
+        page_size_option = [key for key in options
+                            if key.endswith('page_size')][0]
+        self.assertEqual(getattr(engine.dialect, page_size_option), 1000)
+
+    def test_make_engine_postgres_scheme(self):
+        engine = db_ops.make_engine('postgres://user:pwd@db_host:666/db_name')
+        self.assertEqual(engine.url.drivername, 'postgresql')
+        self.assertEqual(engine.url.database, 'db_name')
+
+    def test_get_executemany_options(self):
+        options = db_ops.get_executemany_options('1.3.24')
+        self.assertDictEqual(
+            options,
+            {'executemany_mode': 'values',
+             'executemany_values_page_size': 1000},
+        )
+
+    def test_get_executemany_options_14(self):
+        options = db_ops.get_executemany_options('1.4.52')
+        self.assertDictEqual(
+            options,
+            {'executemany_mode': 'values_only',
+             'executemany_values_page_size': 1000},
+        )
+
+    def test_get_executemany_options_20(self):
+        options = db_ops.get_executemany_options('2.0.36')
+        self.assertDictEqual(options, {'insertmanyvalues_page_size': 1000})
+
+    def test_json_dumps(self):
+        json_str = db_ops.json_dumps({'a': np.int64(5), 3: [1.5, 'b']})
+        self.assertDictEqual(json.loads(json_str), {'a': 5, '3': [1.5, 'b']})
+
     def test_get_datasets(self):
         search_dict = {'project_id': 'TEST'}
         datasets = db_ops.get_datasets(self.session, search_dict)
@@ -110,6 +150,12 @@ class TestDBOperations(db_basetest.DBBaseTest):
         for d in datasets:
             self.assertTrue('PROJECT' in d.dataset_serial)
 
+    def test_get_datasets_project_prefix(self):
+        # Project ID must match the start of the serial
+        search_dict = {'project_id': 'ROJECT'}
+        datasets = db_ops.get_datasets(self.session, search_dict)
+        self.assertEqual(len(datasets), 0)
+
     def test_get_datasets_scope(self):
         search_dict = {'microscope': 'scope2'}
         datasets = db_ops.get_datasets(self.session, search_dict)
@@ -170,61 +216,105 @@ class TestDBOperations(db_basetest.DBBaseTest):
         self.assertIsNone(parent_key)
 
     def test_insert_frames(self):
+        frames = self.frames.all()
         for i, (c, z) in enumerate(itertools.product(range(3), range(2))):
             im_name = 'im_c00{}_z00{}_t005_p050.png'.format(c, z)
-            self.assertEqual(self.frames[i].file_name, im_name)
-            self.assertEqual(self.frames[i].channel_idx, c)
-            self.assertEqual(self.frames[i].channel_name, self.channel_names[c])
-            self.assertEqual(self.frames[i].slice_idx, z)
-            self.assertEqual(self.frames[i].time_idx, 5)
-            self.assertEqual(self.frames[i].pos_idx, 50)
-            self.assertEqual(self.frames[i].sha256, self.sha256)
-            self.assertDictEqual(self.frames[i].metadata_json, self.meta_dict)
+            self.assertEqual(frames[i].file_name, im_name)
+            self.assertEqual(frames[i].channel_idx, c)
+            self.assertEqual(frames[i].channel_name, self.channel_names[c])
+            self.assertEqual(frames[i].slice_idx, z)
+            self.assertEqual(frames[i].time_idx, 5)
+            self.assertEqual(frames[i].pos_idx, 50)
+            self.assertEqual(frames[i].sha256, self.sha256)
+            self.assertDictEqual(frames[i].metadata_json, self.meta_dict)
         # query frames_global
-        global_query = self.session.query(db_ops.FramesGlobal) \
+        frames_global = self.session.query(db_ops.FramesGlobal) \
             .join(db_ops.DataSet) \
-            .filter(db_ops.DataSet.dataset_serial == self.dataset_serial)
+            .filter(db_ops.DataSet.dataset_serial == self.dataset_serial) \
+            .one()
         self.assertEqual(
-            global_query[0].storage_dir,
+            frames_global.storage_dir,
             self.global_meta['storage_dir'],
         )
         self.assertEqual(
-            global_query[0].nbr_frames,
+            frames_global.nbr_frames,
             self.global_meta['nbr_frames'],
         )
         self.assertEqual(
-            global_query[0].im_width,
+            frames_global.im_width,
             self.global_meta['im_width'],
         )
         self.assertEqual(
-            global_query[0].im_height,
+            frames_global.im_height,
             self.global_meta['im_height'],
         )
         self.assertEqual(
-            global_query[0].nbr_slices,
+            frames_global.nbr_slices,
             self.global_meta['nbr_slices'],
         )
         self.assertEqual(
-            global_query[0].nbr_channels,
+            frames_global.nbr_channels,
             self.global_meta['nbr_channels'],
         )
         self.assertEqual(
-            global_query[0].nbr_positions,
+            frames_global.nbr_positions,
             self.global_meta['nbr_positions'],
         )
         self.assertEqual(
-            global_query[0].nbr_timepoints,
+            frames_global.nbr_timepoints,
             self.global_meta['nbr_timepoints'],
         )
         self.assertEqual(
-            global_query[0].im_colors,
+            frames_global.im_colors,
             self.global_meta['im_colors'],
         )
         self.assertEqual(
-            global_query[0].bit_depth,
+            frames_global.bit_depth,
             self.global_meta['bit_depth'],
         )
 
+    def test_insert_frames_copy(self):
+        dataset_serial = 'TEST-2005-10-09-20-00-00-0002'
+        frames_meta = meta_utils.make_dataframe_from_rows([
+            {'channel_idx': 0.0, 'slice_idx': 1, 'time_idx': 2, 'pos_idx': 3,
+             'channel_name': 'tab\there', 'file_name': 'im_0.png',
+             'sha256': self.sha256},
+            {'channel_idx': 1, 'slice_idx': 1, 'time_idx': 2, 'pos_idx': 3,
+             'channel_name': None, 'file_name': 'im_1.png',
+             'sha256': self.sha256},
+        ])
+        frames_json_meta = [{'path': 'C:\\data\nnew line'}, self.meta_dict]
+        db_inst = db_ops.DatabaseOperations(dataset_serial=dataset_serial)
+        with patch('imaging_db.database.db_operations.COPY_MIN_FRAMES', 2):
+            db_inst.insert_frames(
+                session=self.session,
+                description='copied frames',
+                frames_meta=frames_meta,
+                frames_json_meta=frames_json_meta,
+                global_meta=self.global_meta,
+                global_json_meta=self.global_json_meta,
+                microscope=self.microscope,
+            )
+        frames = self.session.query(db_ops.Frames) \
+            .join(db_ops.FramesGlobal) \
+            .join(db_ops.DataSet) \
+            .filter(db_ops.DataSet.dataset_serial == dataset_serial) \
+            .order_by(db_ops.Frames.file_name) \
+            .all()
+        self.assertListEqual(
+            [frame.file_name for frame in frames],
+            ['im_0.png', 'im_1.png'],
+        )
+        self.assertListEqual([frame.channel_idx for frame in frames], [0, 1])
+        self.assertEqual(frames[0].channel_name, 'tab\there')
+        self.assertIsNone(frames[1].channel_name)
+        self.assertListEqual(
+            [frame.metadata_json for frame in frames],
+            frames_json_meta,
+        )
+        self.assertEqual(frames[0].frames_global.data_set.description,
+                         'copied frames')
+
     def test_insert_file(self):
         dataset_serial = 'TEST-2005-10-12-20-00-00-0001'
         db_inst = db_ops.DatabaseOperations(
@@ -343,7 +433,9 @@ class TestDBOperations(db_basetest.DBBaseTest):
         )
 
     def test_get_global_meta(self):
-        global_meta = self.db_inst._get_global_meta(self.frames[0])
+        global_meta = self.db_inst._get_global_meta(
+            self.frames[0].frames_global,
+        )
         expected_meta = self.global_meta
         expected_meta['metadata_json'] = self.global_json_meta
         self.assertDictEqual(global_meta, self.global_meta)
@@ -359,9 +451,8 @@ class TestDBOperations(db_basetest.DBBaseTest):
         expected_names = list(self.frames_meta)
         expected_names.sort()
         self.assertListEqual(col_names, expected_names)
-        for i, row in frames_meta.iterrows():
-            for col in expected_names:
-                self.assertEqual(
-                    row[col],
-                    self.frames_meta.loc[i, col],
-                )
+        pd.testing.assert_frame_equal(
+            frames_meta[expected_names],
+            self.frames_meta[expected_names],
+            check_dtype=False,
+        )
@@ -25,7 +25,7 @@ class TestDataStorage(unittest.TestCase):
                                               self.slice_ids,
                                               self.time_ids,
                                               self.pos_ids):
-            meta_row = dict.fromkeys(meta_utils.DF_NAMES)
+            meta_row = meta_utils.make_meta_row()
             meta_row['channel_idx'] = c
             meta_row['slice_idx'] = z
             meta_row['time_idx'] = t
@@ -93,6 +93,63 @@ class TestDataStorage(unittest.TestCase):
         self.assertListEqual(unique_ids['times'].tolist(), self.time_ids)
         self.assertListEqual(unique_ids['pos'].tolist(), self.pos_ids)
 
+    def test_make_stack_from_meta_contiguous_frames(self):
+        im_stack, _ = self.storage_inst.make_stack_from_meta(
+            global_meta=self.global_meta,
+            frames_meta=self.frames_meta,
+        )
+        # Each 2D frame should be a contiguous block of memory
+        self.assertTrue(im_stack[..., 0, 0, 0, 0].flags['C_CONTIGUOUS'])
+
+    def test_make_stack_from_meta_missing_frames(self):
+        # Frames that aren't in frames_meta should stay zero in the stack
+        im_stack, unique_ids = self.storage_inst.make_stack_from_meta(
+            global_meta=self.global_meta,
+            frames_meta=self.frames_meta[1:],
+        )
+        self.assertEqual(im_stack.shape[3:], (3, 5, 1, 3))
+        self.assertFalse(im_stack.any())
+
+    def _alloc_calls(self, frames_meta):
+        """
+        Make a stack with np.empty and np.zeros wrapped, and return the
+        calls to each that allocated the stack (PTCZXYG shape)
+
+        :param dataframe frames_meta: Local metadata for each frame
+        :return list empty_calls: np.empty calls that allocated the stack
+        :return list zeros_calls: np.zeros calls that allocated the stack
+        """
+        stack_shape = (len(self.pos_ids), len(self.time_ids),
+                       len(self.channel_ids), len(self.slice_ids),
+                       self.im_height, self.im_width, self.im_colors)
+        with patch('numpy.empty', wraps=np.empty) as mock_empty, \
+                patch('numpy.zeros', wraps=np.zeros) as mock_zeros:
+            self.storage_inst.make_stack_from_meta(
+                global_meta=self.global_meta,
+                frames_meta=frames_meta,
+            )
+        empty_calls = [c for c in mock_empty.call_args_list
+                       if c[0] and c[0][0] == stack_shape]
+        zeros_calls = [c for c in mock_zeros.call_args_list
+                       if c[0] and c[0][0] == stack_shape]
+        return empty_calls, zeros_calls
+
+    def test_make_stack_from_meta_full_coverage_empty(self):
+        # Every slot gets written, so the stack isn't zeroed
+        empty_calls, zeros_calls = self._alloc_calls(self.frames_meta)
+        self.assertEqual(len(empty_calls), 1)
+        self.assertEqual(len(zeros_calls), 0)
+
+    def test_make_stack_from_meta_duplicate_frames(self):
+        # The second frame duplicates the indices of the first, so the frame
+        # count matches the stack but one slot is never written
+        frames_meta = self.frames_meta.copy()
+        idx_cols = ["channel_idx", "slice_idx", "time_idx", "pos_idx"]
+        frames_meta.loc[1, idx_cols] = frames_meta.loc[0, idx_cols].values
+        empty_calls, zeros_calls = self._alloc_calls(frames_meta)
+        self.assertEqual(len(empty_calls), 0)
+        self.assertEqual(len(zeros_calls), 1)
+
     def test_squeeze_stack(self):
         im_stack = np.zeros((10, 20, 1, 10, 20, 1, 30))
         im_stack, dim_str = self.storage_inst.squeeze_stack(im_stack)
@@ -301,6 +301,13 @@ class TestLocalStorage(unittest.TestCase):
             nose.tools.assert_equal(im_out.dtype, np.uint16)
             numpy.testing.assert_array_equal(im_out, self.im_stack[..., i])
 
+    @nose.tools.raises(FileNotFoundError)
+    def test_download_files_missing(self):
+        self.data_storage.download_files(
+            file_names=['not_in_storage.png'],
+            dest_dir=self.temp_path,
+        )
+
     def test_download_file(self):
         # Download the temporary image then read it and validate
         self.existing_storage.download_file(
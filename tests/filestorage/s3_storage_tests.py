@@ -7,6 +7,7 @@ import numpy.testing
 import os
 from testfixtures import TempDirectory
 import unittest
+from unittest.mock import patch
 
 import imaging_db.filestorage.s3_storage as s3_storage
 import imaging_db.utils.image_utils as im_utils
@@ -60,6 +61,18 @@ class TestS3Storage(unittest.TestCase):
         )
         self.assertEqual(data_storage.bucket_name, 'test_bucket_name')
 
+    def test_shared_client(self):
+        storage_one = s3_storage.S3Storage(self.storage_dir, self.nbr_workers)
+        storage_two = s3_storage.S3Storage(
+            'raw_files/ISP-2005-06-09-20-00-00-0002',
+            self.nbr_workers,
+        )
+        self.assertIs(storage_one.s3_client, storage_two.s3_client)
+        self.assertEqual(
+            storage_one.s3_client.meta.config.max_pool_connections,
+            64,
+        )
+
     def test_assert_unique_id(self):
         data_storage = s3_storage.S3Storage(self.storage_dir, self.nbr_workers)
         data_storage.assert_unique_id()
@@ -70,6 +83,16 @@ class TestS3Storage(unittest.TestCase):
         data_storage.upload_file(file_path=self.file_path)
         data_storage.assert_unique_id()
 
+    def test_assert_unique_id_sibling_serial(self):
+        # A serial that starts with this serial is a different dataset
+        sibling_storage = s3_storage.S3Storage(
+            self.storage_dir + '1',
+            self.nbr_workers,
+        )
+        sibling_storage.upload_file(file_path=self.file_path)
+        data_storage = s3_storage.S3Storage(self.storage_dir, self.nbr_workers)
+        data_storage.assert_unique_id()
+
     def test_nonexistent_storage_path(self):
         data_storage = s3_storage.S3Storage(self.storage_dir, self.nbr_workers)
         storage_path = os.path.join(self.storage_dir, self.im_name)
@@ -85,6 +108,15 @@ class TestS3Storage(unittest.TestCase):
             storage_path=storage_path,
         ))
 
+    def test_nonexistent_storage_path_key_prefix(self):
+        # A key that only shares a prefix with an existing key doesn't exist
+        data_storage = s3_storage.S3Storage(self.storage_dir, self.nbr_workers)
+        data_storage.upload_file(file_path=self.file_path)
+        storage_path = os.path.join(self.storage_dir, self.im_name[:-1])
+        self.assertTrue(data_storage.nonexistent_storage_path(
+            storage_path=storage_path,
+        ))
+
     def test_upload_frames(self):
         # Upload image stack
         storage_dir = "raw_frames/ML-2005-05-23-10-00-00-0001"
@@ -124,6 +156,62 @@ class TestS3Storage(unittest.TestCase):
             nose.tools.assert_equal(im.dtype, np.uint16)
             numpy.testing.assert_array_equal(im, im_stack[..., im_nbr])
 
+    def test_get_existing_keys(self):
+        data_storage = s3_storage.S3Storage(self.storage_dir, self.nbr_workers)
+        self.assertSetEqual(data_storage.get_existing_keys(), set())
+        data_storage.upload_frames(self.stack_names, self.im_stack)
+        expected_keys = {"/".join([self.storage_dir, im_name])
+                         for im_name in self.stack_names}
+        self.assertSetEqual(data_storage.get_existing_keys(), expected_keys)
+
+    def test_get_existing_keys_sibling_serial(self):
+        sibling_storage = s3_storage.S3Storage(
+            self.storage_dir + '1',
+            self.nbr_workers,
+        )
+        sibling_storage.upload_frames(self.stack_names, self.im_stack)
+        data_storage = s3_storage.S3Storage(self.storage_dir, self.nbr_workers)
+        self.assertSetEqual(data_storage.get_existing_keys(), set())
+
+    def test_upload_frames_existing_key(self):
+        data_storage = s3_storage.S3Storage(self.storage_dir, self.nbr_workers)
+        data_storage.upload_frames(self.stack_names[:1], self.im_stack[..., :1])
+        with captured_output() as (out, err):
+            data_storage.upload_frames(self.stack_names, self.im_stack)
+        key = "/".join([self.storage_dir, self.stack_names[0]])
+        self.assertEqual(
+            out.getvalue().strip(),
+            "Key {} already exists, next.".format(key),
+        )
+        # The new frame is still uploaded
+        key = "/".join([self.storage_dir, self.stack_names[1]])
+        byte_string = self.conn.Object(self.bucket_name, key).get()['Body'].read()
+        im = im_utils.deserialize_im(byte_string)
+        numpy.testing.assert_array_equal(im, self.im_stack[..., 1])
+
+    def test_upload_frames_lists_keys_once(self):
+        data_storage = s3_storage.S3Storage(self.storage_dir, self.nbr_workers)
+        with patch.object(data_storage,
+                          'get_existing_keys',
+                          wraps=data_storage.get_existing_keys) as mock_list:
+            data_storage.upload_frames(
+                self.stack_names[:1],
+                self.im_stack[..., :1],
+            )
+            with captured_output() as (out, err):
+                data_storage.upload_frames(self.stack_names, self.im_stack)
+        # Storage dir is only listed for the first upload
+        self.assertEqual(mock_list.call_count, 1)
+        # Keys uploaded by the first call are still skipped
+        key = "/".join([self.storage_dir, self.stack_names[0]])
+        self.assertEqual(
+            out.getvalue().strip(),
+            "Key {} already exists, next.".format(key),
+        )
+        expected_keys = {"/".join([self.storage_dir, im_name])
+                         for im_name in self.stack_names}
+        self.assertSetEqual(data_storage.get_existing_keys(), expected_keys)
+
     def test_upload_serialized(self):
         data_storage = s3_storage.S3Storage(self.storage_dir, self.nbr_workers)
         key = "/".join([self.storage_dir, self.im_name])
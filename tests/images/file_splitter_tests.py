@@ -1,6 +1,7 @@
 import nose.tools
 import numpy as np
 import os
+import pandas as pd
 import unittest
 from testfixtures import TempDirectory
 from unittest.mock import patch
@@ -81,6 +82,38 @@ class TestFileSplitter(unittest.TestCase):
         im_name = self.mock_inst._get_imname(meta_row=meta_row)
         nose.tools.assert_equal(im_name, 'im_c006_z013_t005_p007.png')
 
+    def test_make_im_stack(self):
+        self.mock_inst.frame_shape = (12, 15)
+        self.mock_inst.im_colors = 1
+        self.mock_inst.bit_depth = 'uint16'
+        im_stack = self.mock_inst._make_im_stack(nbr_frames=5)
+        nose.tools.assert_equal(im_stack.shape, (12, 15, 1, 5))
+        nose.tools.assert_equal(im_stack.dtype, np.uint16)
+        # Each frame should be contiguous in memory
+        nose.tools.assert_true(im_stack[..., 2].flags['C_CONTIGUOUS'])
+
+    def test_get_frame_index(self):
+        self.mock_inst.frame_shape = (12, 15)
+        self.mock_inst.im_colors = 1
+        self.mock_inst.bit_depth = 'uint16'
+        im_stack = self.mock_inst._make_im_stack(nbr_frames=2)
+        im_stack[self.mock_inst._get_frame_index() + (1,)] = \
+            np.ones((12, 15), dtype=np.uint16)
+        nose.tools.assert_true((im_stack[..., 1] == 1).all())
+
+    def test_get_imnames(self):
+        frames_meta = pd.DataFrame({
+            "channel_idx": [6, 0],
+            "slice_idx": [13, 1],
+            "time_idx": [5, 100],
+            "pos_idx": [7, 2],
+        })
+        im_names = self.mock_inst._get_imnames(frames_meta=frames_meta)
+        nose.tools.assert_list_equal(
+            im_names.tolist(),
+            ['im_c006_z013_t005_p007.png', 'im_c000_z001_t100_p002.png'],
+        )
+
     def test_set_global_meta(self):
         nbr_frames = 666
         test_shape = (12, 15)
@@ -90,7 +123,7 @@ class TestFileSplitter(unittest.TestCase):
             "time_idx": 5,
             "pos_idx": 7,
         }
-        self.mock_inst.frames_meta = meta_row
+        self.mock_inst.frames_meta = pd.DataFrame([meta_row])
         self.mock_inst.frame_shape = test_shape
         self.mock_inst.im_colors = 1
         self.mock_inst.bit_depth = 'uint16'
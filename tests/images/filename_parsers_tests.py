@@ -35,7 +35,7 @@ def test_parse_ml_name_stack_str():
 def test_parse_sms_name():
     file_name = 'img_phase_t500_p400_z300.tif'
     channel_names = ['brightfield']
-    meta_row = dict.fromkeys(meta_utils.DF_NAMES)
+    meta_row = meta_utils.make_meta_row()
     file_parsers.parse_sms_name(file_name, meta_row, channel_names)
     nose.tools.assert_equal(channel_names, ['brightfield', 'phase'])
     nose.tools.assert_equal(meta_row['channel_name'], 'phase')
@@ -48,7 +48,7 @@ def test_parse_sms_name():
 def test_parse_sms_name_long_channel():
     file_name = 'img_long_c_name_t001_z002_p003.tif'
     channel_names = []
-    meta_row = dict.fromkeys(meta_utils.DF_NAMES)
+    meta_row = meta_utils.make_meta_row()
     file_parsers.parse_sms_name(file_name, meta_row, channel_names)
     nose.tools.assert_equal(channel_names, ['long_c_name'])
     nose.tools.assert_equal(meta_row['channel_name'], 'long_c_name')
@@ -61,7 +61,7 @@ def test_parse_sms_name_long_channel():
 def test_parse_idx_from_name():
     file_name = 'im_c600_z500_t400_p300.png'
     channel_names = []
-    meta_row = dict.fromkeys(meta_utils.DF_NAMES)
+    meta_row = meta_utils.make_meta_row()
     file_parsers.parse_idx_from_name(file_name, meta_row, channel_names)
     nose.tools.assert_equal(channel_names, ['600'])
     nose.tools.assert_equal(meta_row['channel_name'], '600')
@@ -75,5 +75,5 @@ def test_parse_idx_from_name():
 def test_parse_idx_from_name_no_channel():
     file_name = 'img_phase_t500_p400_z300.tif'
     channel_names = []
-    meta_row = dict.fromkeys(meta_utils.DF_NAMES)
+    meta_row = meta_utils.make_meta_row()
     file_parsers.parse_idx_from_name(file_name, meta_row, channel_names)
@@ -8,6 +8,7 @@ import os
 from testfixtures import TempDirectory
 import tifffile
 import unittest
+from unittest.mock import patch
 
 import imaging_db.images.ometif_splitter as ometif_splitter
 import imaging_db.utils.aux_utils as aux_utils
@@ -192,6 +193,17 @@ class TestOmeTiffSplitter(unittest.TestCase):
         nose.tools.assert_equal(len(found_paths), 1)
         nose.tools.assert_equal(found_paths[0], self.file_path3)
 
+    def test_validate_file_paths_label_prefix(self):
+        self.frames_inst.global_json["IJMetadata"]["InitialPositionList"] = \
+            [{"Label": "Pos1"}, {"Label": "Pos10"}]
+        file_path10 = os.path.join(self.temp_path, "test_Pos10.ome.tif")
+        found_paths = self.frames_inst._validate_file_paths(
+            positions=[1, 10],
+            glob_paths=[file_path10, self.file_path1],
+        )
+        # Pos1 shouldn't be matched with the file for Pos10
+        nose.tools.assert_equal(found_paths, [self.file_path1, file_path10])
+
     @nose.tools.raises(AssertionError)
     def test_validate_no_matching_paths(self):
         postions = [100, 200]
@@ -270,3 +282,29 @@ class TestOmeTiffSplitter(unittest.TestCase):
         self.assertEqual(frames_inst.global_meta['nbr_positions'], 1)
         self.assertEqual(frames_inst.global_meta['im_colors'], 1)
         self.assertEqual(frames_inst.global_meta['bit_depth'], 'uint8')
+
+    def test_get_frames_and_metadata_error_closes_files(self):
+        # Files opened before an error is raised should still be closed
+        opened_files = []
+        tiff_file = tifffile.TiffFile
+
+        def open_tiff(*args, **kwargs):
+            frames = tiff_file(*args, **kwargs)
+            opened_files.append(frames)
+            return frames
+
+        frames_inst = ometif_splitter.OmeTiffSplitter(
+            data_path=self.temp_path,
+            storage_dir="raw_frames/ISP-2005-06-09-20-00-00-0004",
+            storage_class=self.storage_class,
+        )
+        with patch('tifffile.TiffFile', side_effect=open_tiff), \
+                patch('imaging_db.metadata.json_operations.read_json_file',
+                      side_effect=IOError('Schema read failed')):
+            with self.assertRaises(IOError):
+                frames_inst.get_frames_and_metadata(
+                    schema_filename=self.schema_file_path,
+                    positions='[1, 3]',
+                )
+        self.assertEqual(len(opened_files), 1)
+        self.assertTrue(opened_files[0].filehandle.closed)
@@ -7,6 +7,7 @@ import nose.tools
 import numpy as np
 import numpy.testing
 import os
+import pandas as pd
 from testfixtures import TempDirectory
 import tifffile
 import unittest
@@ -22,8 +23,8 @@ import imaging_db.utils.meta_utils as meta_utils
 
 def map_mock(fn, *iterables):
     """
-    Mocking out the map function of multiprocessing because moto
-    doesn't play well with multiprocessing
+    Mocking out the map function of the thread pool so frames are
+    uploaded to moto in order
     """
     res = []
     for i in iterables[0]:
@@ -34,12 +35,12 @@ def map_mock(fn, *iterables):
 
 class TestTifFolderSplitter(unittest.TestCase):
 
-    @patch('concurrent.futures.ProcessPoolExecutor')
+    @patch('concurrent.futures.ThreadPoolExecutor')
     def setUp(self, MockPoolExecutor):
         """
         Set up temporary test directory and mock S3 bucket connection
         """
-        # Magic mocking of multiprocessing
+        # Magic mocking of the thread pool
         MockPoolExecutor().__enter__().map = map_mock
         # Mock S3 directory for upload
         self.storage_dir = "raw_frames/SMS-2010-01-01-00-00-00-0001"
@@ -49,6 +50,8 @@ class TestTifFolderSplitter(unittest.TestCase):
         # Temporary frame
         self.im = np.ones((10, 15), dtype=np.uint16)
         self.im[2:5, 3:12] = 10000
+        # All channels share the same two slices, only compute them once
+        self.slices = [self.im + 5000 * z for z in range(2)]
         # Save test tif files
         self.channel_names = ['phase', 'brightfield', '666']
         # Write files in dir
@@ -59,7 +62,7 @@ class TestTifFolderSplitter(unittest.TestCase):
                 ijmeta = {"Info": json.dumps({"c": c, "z": z})}
                 tifffile.imsave(
                     file_path,
-                    self.im + 5000 * z,
+                    self.slices[z],
                     ijmetadata=ijmeta,
                 )
         # Write external metadata in dir
@@ -121,18 +124,22 @@ class TestTifFolderSplitter(unittest.TestCase):
 
     def test_get_frames_meta(self):
         frames_meta = self.frames_inst.get_frames_meta()
-        for i, (c, z) in enumerate(itertools.product(range(3), range(2))):
-            # Validate file name
-            expected_name = 'im_c00{}_z00{}_t000_p050.png'.format(c, z)
-            self.assertEqual(frames_meta.loc[i, 'file_name'], expected_name)
-            # Validate checksum
-            expected_sha = meta_utils.gen_sha256(self.im + 5000 * z)
-            self.assertEqual(frames_meta.loc[i, 'sha256'], expected_sha)
-            # Validate indices
-            self.assertEqual(frames_meta.loc[i, 'channel_idx'], c)
-            self.assertEqual(frames_meta.loc[i, 'slice_idx'], z)
-            self.assertEqual(frames_meta.loc[i, 'time_idx'], 0)
-            self.assertEqual(frames_meta.loc[i, 'pos_idx'], 50)
+        frame_idx = list(itertools.product(range(3), range(2)))
+        sha_by_z = [meta_utils.gen_sha256(im) for im in self.slices]
+        expected_meta = pd.DataFrame({
+            'file_name': ['im_c00{}_z00{}_t000_p050.png'.format(c, z)
+                          for c, z in frame_idx],
+            'sha256': [sha_by_z[z] for c, z in frame_idx],
+            'channel_idx': [c for c, z in frame_idx],
+            'slice_idx': [z for c, z in frame_idx],
+            'time_idx': 0,
+            'pos_idx': 50,
+        })
+        pd.testing.assert_frame_equal(
+            frames_meta[list(expected_meta)],
+            expected_meta,
+            check_dtype=False,
+        )
 
     def test_get_frames_json(self):
         frames_json = self.frames_inst.get_frames_json()
@@ -230,7 +237,7 @@ class TestTifFolderSplitter(unittest.TestCase):
             im = im_utils.deserialize_im(byte_string)
             # Assert that contents are the same
             self.assertEqual(im.dtype, np.uint16)
-            numpy.testing.assert_array_equal(im, self.im + 5000 * z)
+            numpy.testing.assert_array_equal(im, self.slices[z])
 
     @nose.tools.raises(AttributeError)
     def test_get_frames_and_metadata_no_parser(self):
@@ -238,9 +245,9 @@ class TestTifFolderSplitter(unittest.TestCase):
             filename_parser='nonexisting_function',
         )
 
-    @patch('concurrent.futures.ProcessPoolExecutor')
+    @patch('concurrent.futures.ThreadPoolExecutor')
     def test_get_frames_no_metadata(self, MockPoolExecutor):
-        # Magic mocking of multiprocessing
+        # Magic mocking of the thread pool
         MockPoolExecutor().__enter__().map = map_mock
         os.remove(self.json_filename)
         self.frames_inst.get_frames_and_metadata(
@@ -252,7 +259,7 @@ class TestTifFolderSplitter(unittest.TestCase):
             expected_name = 'im_c00{}_z00{}_t000_p050.png'.format(c, z)
             self.assertEqual(frames_meta.loc[i, 'file_name'], expected_name)
             # Validate checksum
-            expected_sha = meta_utils.gen_sha256(self.im + 5000 * z)
+            expected_sha = meta_utils.gen_sha256(self.slices[z])
             self.assertEqual(frames_meta.loc[i, 'sha256'], expected_sha)
             # Validate indices
             self.assertEqual(frames_meta.loc[i, 'channel_idx'], c)
@@ -26,6 +26,14 @@ def test_validate_schema():
         schema="MICROMETA_SCHEMA")
 
 
+def test_validate_schema_cached_validator():
+    json_obj = {"upload_type": "frames", "microscope": "scope"}
+    json_ops.validate_schema(json_obj, schema="CONFIG_SCHEMA")
+    hits = json_ops._get_validator.cache_info().hits
+    json_ops.validate_schema(json_obj, schema=json_ops.CONFIG_SCHEMA)
+    nose.tools.assert_equal(json_ops._get_validator.cache_info().hits, hits + 1)
+
+
 @nose.tools.raises(jsonschema.exceptions.ValidationError)
 def test_invalid_schema_credentials():
     invalid_json = {
@@ -1,7 +1,9 @@
 import nose.tools
 import os
+from testfixtures import TempDirectory
 from unittest.mock import patch
 
+import imaging_db.metadata.json_operations as json_ops
 import imaging_db.utils.db_utils as db_utils
 import tests.database.db_basetest as db_basetest
 
@@ -34,6 +36,38 @@ def test_get_connection_str():
     nose.tools.assert_equal(credentials_str, expected_str)
 
 
+def test_get_connection_str_updated_file():
+    credentials_json = {
+        "drivername": "postgres",
+        "username": "user",
+        "password": "pwd",
+        "host": "db_host",
+        "port": 666,
+        "dbname": "db_name"
+    }
+    with TempDirectory() as tempdir:
+        credentials_filename = os.path.join(tempdir.path, 'login.json')
+        json_ops.write_json_file(credentials_json, credentials_filename)
+        credentials_str = db_utils.get_connection_str(credentials_filename)
+        nose.tools.assert_equal(
+            credentials_str,
+            "postgres://user:pwd@db_host:666/db_name",
+        )
+        # Edited credentials must not be served from the cache
+        credentials_json["dbname"] = "other_db"
+        json_ops.write_json_file(credentials_json, credentials_filename)
+        credentials_str = db_utils.get_connection_str(credentials_filename)
+        nose.tools.assert_equal(
+            credentials_str,
+            "postgres://user:pwd@db_host:666/other_db",
+        )
+
+
+@nose.tools.raises(FileNotFoundError)
+def test_get_connection_str_no_file():
+    db_utils.get_connection_str('not_a_file.json')
+
+
 class TestConnection(db_basetest.DBBaseTest):
     """
     Test the data connection
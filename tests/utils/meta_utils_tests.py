@@ -19,6 +19,26 @@ def test_make_dataframe():
     nose.tools.assert_equal(test_col_names, list(frames_meta))
 
 
+def test_make_dataframe_from_rows():
+    rows = [{"A": 1, "B": "x"}, {"A": 2}]
+    frames_meta = meta_utils.make_dataframe_from_rows(
+        rows,
+        col_names=["A", "B"],
+    )
+    nose.tools.assert_equal(frames_meta.shape, (2, 2))
+    nose.tools.assert_equal(frames_meta["A"].tolist(), [1, 2])
+    nose.tools.assert_equal(frames_meta.loc[0, "B"], "x")
+
+
+def test_make_meta_row():
+    meta_row = meta_utils.make_meta_row()
+    nose.tools.assert_equal(list(meta_row), meta_utils.DF_NAMES)
+    nose.tools.assert_true(all(v is None for v in meta_row.values()))
+    # Rows must not share state
+    meta_row['channel_idx'] = 3
+    nose.tools.assert_is_none(meta_utils.make_meta_row()['channel_idx'])
+
+
 def test_make_empty_dataframe():
     expected_names = [
         "channel_idx",